@@ -0,0 +1,253 @@
+"""
+analysis.py
+
+Difficulty metrics for perfect mazes, computed straight from a flat wall
+buffer (see grid.py for the bit layout):
+
+- dead_ends, junctions: cells with one, and with three or more, openings
+- solution_length: moves from start to goal
+- tortuosity: solution_length over the Manhattan distance from start to goal
+- longest_corridor: moves in the longest passage without a branch
+- river: mean moves per passage; long winding passages score high, mazes
+  of many short dead ends low
+- branching_factor: mean number of ways onward at a junction
+
+With numpy everything is vectorized. The solution length and corridors
+come from the Euler tour a wall follower takes around the maze: each open
+passage is a pair of half-edges, the half-edge that follows each one is a
+table lookup on its far cell's openings, and pointer jumping then ranks the
+whole tour in log2(passages) rounds. A half-edge is on the solution if it
+heads away from the start and its return is taken after the goal is reached.
+Ranking takes most of the time, so analyze(paths=False) skips the tour and
+returns only the metrics read off the openings.
+"""
+
+from grid import RIGHT, BOTTOM, load_numpy, wall_array
+
+# Directions are numbered clockwise as in the wall bits: 0 top, 1 right,
+# 2 bottom, 3 left
+
+
+def _turn_table():
+    # _TURNS[openings][side]: the way out of a cell entered from side, trying
+    # the directions clockwise after it and turning back at a dead end
+    table = []
+    for openings in range(16):
+        row = []
+        for side in range(4):
+            out = side
+            for turn in (1, 2, 3):
+                if openings >> ((side + turn) & 3) & 1:
+                    out = (side + turn) & 3
+                    break
+            row.append(out)
+        table.append(row)
+    return table
+
+
+_TURNS = _turn_table()
+# Openings per 4-bit mask of open directions
+_DEGREE = [bin(openings).count("1") for openings in range(16)]
+
+
+class MazeAnalysis:
+    FIELDS = ("dead_ends", "junctions", "solution_length", "tortuosity",
+              "longest_corridor", "river", "branching_factor")
+
+    def __init__(self, dead_ends, junctions, solution_length, tortuosity,
+                 longest_corridor, river, branching_factor):
+        self.dead_ends = dead_ends
+        self.junctions = junctions
+        self.solution_length = solution_length    # moves
+        self.tortuosity = tortuosity
+        self.longest_corridor = longest_corridor  # moves
+        self.river = river
+        self.branching_factor = branching_factor
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{name}={value:.3f}" if isinstance(value, float) else f"{name}={value}"
+            for name, value in self.as_dict().items()
+        )
+        return f"MazeAnalysis({fields})"
+
+
+def analyze(walls, num_rows, num_cols, start=(0, 0), goal=None, paths=True):
+    """
+    Metrics of a perfect maze, with the solution from start to goal (default:
+    bottom-right cell). Only interior openings count, so an open entrance or
+    exit does not change a cell's degree. Raises ValueError if the maze has
+    loops or cells cut off from the rest.
+
+    With paths=False the Euler tour is skipped: solution_length, tortuosity
+    and longest_corridor are None, and only the opening count is checked
+    (enough to catch loops in a connected maze, not detached cells). The
+    other metrics come from one vectorized pass, for screening many mazes.
+    """
+    if goal is None:
+        goal = (num_rows - 1, num_cols - 1)
+    start_k = start[0] * num_cols + start[1]
+    goal_k = goal[0] * num_cols + goal[1]
+    np = load_numpy()
+    if np is None:
+        degree, solution, longest = _tour_python(walls, num_rows, num_cols, start_k, goal_k,
+                                                 paths)
+    else:
+        degree, solution, longest = _tour_numpy(np, walls, num_rows, num_cols,
+                                                start_k, goal_k, paths)
+    # degree[d]: number of cells with d openings
+    passages = (degree[1] + 3 * degree[3] + 4 * degree[4]) / 2
+    junctions = degree[3] + degree[4]
+    tortuosity = None
+    if paths:
+        straight = abs(goal[0] - start[0]) + abs(goal[1] - start[1])
+        tortuosity = solution / straight if straight else 1.0
+    return MazeAnalysis(
+        dead_ends=degree[1],
+        junctions=junctions,
+        solution_length=solution,
+        tortuosity=tortuosity,
+        longest_corridor=longest,
+        river=(num_rows * num_cols - 1) / passages if passages else 0.0,
+        branching_factor=(2 * degree[3] + 3 * degree[4]) / junctions if junctions else 0.0,
+    )
+
+
+def _not_perfect():
+    return ValueError("analyze needs a perfect maze, found loops or unreachable cells")
+
+
+def _tour_numpy(np, walls, num_rows, num_cols, start_k, goal_k, paths=True):
+    # (cells per degree, solution moves, longest corridor moves)
+    size = num_rows * num_cols
+    w = wall_array(np, walls, size).reshape(num_rows, num_cols)
+    # Openings read from the right and bottom walls only, so each passage is
+    # seen once and the outer border never counts
+    right = (w & RIGHT) == 0
+    right[:, -1] = False
+    down = (w & BOTTOM) == 0
+    down[-1, :] = False
+    openings = (right << 1) | (down << 2)
+    openings[1:] |= down[:-1]
+    openings[:, 1:] |= right[:, :-1] << 3
+    openings = openings.reshape(-1)
+    degree = np.array(_DEGREE, dtype=np.uint8)[openings]
+    histogram = np.bincount(degree, minlength=5).tolist()
+    east = np.flatnonzero(right)
+    south = np.flatnonzero(down)
+    edges = east.size + south.size
+    if edges != size - 1:
+        raise _not_perfect()
+    if not paths:
+        return histogram, None, None
+    if edges == 0:
+        return histogram, 0, 0
+
+    # Half-edges in four blocks: east, west, south and north moves, each as
+    # (tail cell, head cell, direction, side of head it enters through).
+    # Half-edge i and back[i] are the two directions of one passage; with
+    # this layout back swaps the east/west and the south/north blocks.
+    blocks = ((east, east + 1, 1, 3), (east + 1, east, 3, 1),
+              (south, south + num_cols, 2, 0), (south + num_cols, south, 0, 2))
+    count = 2 * edges
+    # index[cell * 4 + direction]: the half-edge leaving cell that way
+    index = np.empty(4 * size, dtype=np.intp)
+    offset = 0
+    for tail, _, move, _ in blocks:
+        index[tail * 4 + move] = np.arange(offset, offset + tail.size)
+        offset += tail.size
+    # Each block enters its heads through one side, so the turn taken there
+    # only depends on the head's openings
+    turns = np.array(_TURNS, dtype=np.intp).T
+    succ = np.concatenate([index[head * 4 + turns[side][openings[head]]]
+                           for _, head, _, side in blocks])
+
+    # Cut the tour just before the first half-edge out of start, then rank
+    start_open = int(openings[start_k])
+    first = index[start_k * 4 + (start_open & -start_open).bit_length() - 1]
+    last = int(np.flatnonzero(succ == first)[0])
+    succ[last] = last
+    dist = np.ones(count, dtype=np.intp)
+    dist[last] = 0
+    for _ in range((count - 1).bit_length()):
+        dist = dist + dist[succ]
+        succ = succ[succ]
+    if (succ != last).any():  # half-edges on another tour: some cells are cut off
+        raise _not_perfect()
+    order = count - 1 - dist   # position in the tour
+    e, s = east.size, south.size
+    order_back = np.concatenate((order[e:2 * e], order[:e],
+                                 order[2 * e + s:], order[2 * e:2 * e + s]))
+
+    away = order < order_back
+    solution = 0
+    if goal_k != start_k:
+        # The tour first reaches goal by a half-edge heading away from start:
+        # the return of one of the goal's own outgoing half-edges
+        goal_open = int(openings[goal_k])
+        out = index[[goal_k * 4 + d for d in range(4) if goal_open >> d & 1]]
+        reached = int(order_back[out].min())
+        solution = int(np.count_nonzero(away & (order <= reached) & (order_back > reached)))
+
+    # Corridors end where the tour enters a cell that does not have two openings
+    heads = np.concatenate([head for _, head, _, _ in blocks])
+    branch = np.empty(count, dtype=bool)
+    branch[order] = degree[heads] != 2
+    ends = np.flatnonzero(branch)
+    longest = int(max(np.diff(ends).max(initial=0), ends[0] + count - ends[-1]))
+    return histogram, solution, longest
+
+
+def _tour_python(walls, num_rows, num_cols, start_k, goal_k, paths=True):
+    # Same as _tour_numpy with a breadth-first walk and corridor walks
+    size = num_rows * num_cols
+    last_col = num_cols - 1
+    last_row = size - num_cols
+    links = [[] for _ in range(size)]
+    edges = 0
+    for k in range(size):
+        w = walls[k]
+        if not w & RIGHT and k % num_cols != last_col:
+            links[k].append(k + 1)
+            links[k + 1].append(k)
+            edges += 1
+        if not w & BOTTOM and k < last_row:
+            links[k].append(k + num_cols)
+            links[k + num_cols].append(k)
+            edges += 1
+    if edges != size - 1:
+        raise _not_perfect()
+    if not paths:
+        histogram = [0] * 5
+        for nbrs in links:
+            histogram[len(nbrs)] += 1
+        return histogram, None, None
+
+    depth = [-1] * size
+    depth[start_k] = 0
+    queue = [start_k]
+    for k in queue:
+        for next_k in links[k]:
+            if depth[next_k] < 0:
+                depth[next_k] = depth[k] + 1
+                queue.append(next_k)
+    if len(queue) != size:
+        raise _not_perfect()
+
+    histogram = [0] * 5
+    longest = 0
+    for k, nbrs in enumerate(links):
+        histogram[len(nbrs)] += 1
+        if len(nbrs) == 2:
+            continue
+        for next_k in nbrs:
+            prev, moves = k, 1
+            while len(links[next_k]) == 2:
+                a, b = links[next_k]
+                prev, next_k = next_k, (b if a == prev else a)
+                moves += 1
+            longest = max(longest, moves)
+    return histogram, depth[goal_k], longest
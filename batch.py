@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+batch.py
+
+Headless batch generation of seeded mazes across a process pool. Each maze
+is built with compact storage and returned as its flat wall bytes (one
+byte per cell, row-major, bit layout from grid.py), which can be turned
+back into a grid with CompactGrid(num_rows, num_cols, bytearray(data)).
+
+Usage:
+    python batch.py --rows 100 --cols 100 --seeds 0:1000 --workers 8 --out mazes
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from maze import Maze
+import mazefile
+
+
+def build_maze(seed, num_rows, num_cols):
+    """Generate one headless maze and return its wall bytes."""
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, compact=True)
+    return bytes(maze._cells.walls)
+
+
+def generate_batch(seeds, num_rows, num_cols, workers=None, chunksize=None):
+    """
+    Build one maze per seed and return their wall bytes in seed order.
+
+    - workers: pool size (defaults to the CPU count); 1 builds in-process.
+    - chunksize: seeds handed to a worker at a time; by default the seeds
+      are split into about four chunks per worker to amortize IPC.
+    """
+    seeds = list(seeds)
+    build = partial(build_maze, num_rows=num_rows, num_cols=num_cols)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(seeds) <= 1:
+        return [build(seed) for seed in seeds]
+
+    if chunksize is None:
+        chunksize = max(1, len(seeds) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(build, seeds, chunksize=chunksize))
+
+
+def parse_seeds(spec):
+    # "0:100" -> range(0, 100); "1,5,9" -> [1, 5, 9]
+    if ":" in spec:
+        start, stop = spec.split(":", 1)
+        return range(int(start), int(stop))
+    return [int(seed) for seed in spec.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate seeded mazes in bulk.")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--cols", type=int, required=True)
+    parser.add_argument("--seeds", required=True,
+                        help="seed range start:stop or comma separated list")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="mazes",
+                        help="directory for the per-seed maze files")
+    args = parser.parse_args(argv)
+
+    seeds = parse_seeds(args.seeds)
+    grids = generate_batch(seeds, args.rows, args.cols, workers=args.workers)
+
+    os.makedirs(args.out, exist_ok=True)
+    for seed, data in zip(seeds, grids):
+        path = os.path.join(args.out, f"maze_{seed}.maze")
+        mazefile.save(path, data, args.rows, args.cols, seed)
+    print(f"Wrote {len(grids)} mazes to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+events.py
+
+Compact record of what a maze did while it was generated and solved, so
+rendering can happen later (and faster, slower, partially or elsewhere)
+instead of inline with the algorithms. Each event is (op, i, j, direction),
+where direction is a wall bit from grid.py, packed into one 64-bit integer.
+"""
+
+from array import array
+from grid import TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS, OPPOSITE, wall_segments
+
+# Event ops
+VISIT = 0   # generation entered cell (i, j)
+BREAK = 1   # the wall on side `direction` of (i, j) was removed
+MOVE = 2    # the solver stepped from (i, j) towards `direction`
+UNDO = 3    # the solver backtracked over that step
+
+_STEP = {TOP: (-1, 0), RIGHT: (0, 1), BOTTOM: (1, 0), LEFT: (0, -1)}
+
+
+def direction_between(i, j, next_i, next_j):
+    # Wall bit of (i, j) facing the neighbouring cell (next_i, next_j)
+    if next_i < i:
+        return TOP
+    if next_i > i:
+        return BOTTOM
+    if next_j > j:
+        return RIGHT
+    return LEFT
+
+
+class EventLog:
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.records = array("Q")
+
+    def append(self, op, i, j, direction=0):
+        # Layout: i in bits 36-63, j in bits 8-35, direction in 4-7, op in 0-3
+        self.records.append((i << 36) | (j << 8) | (direction << 4) | op)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, n):
+        return _decode(self.records[n])
+
+    def __iter__(self):
+        for record in self.records:
+            yield _decode(record)
+
+    @classmethod
+    def frombytes(cls, num_rows, num_cols, data):
+        log = cls(num_rows, num_cols)
+        log.records.frombytes(data)
+        return log
+
+    def count(self, op):
+        return sum(1 for record in self.records if record & 0xF == op)
+
+
+def _decode(record):
+    return (record & 0xF, record >> 36, (record >> 8) & 0x0FFFFFFF, (record >> 4) & 0xF)
+
+
+class Replayer:
+    """
+    Draws an EventLog onto anything with the Window drawing interface
+    (Window, offscreen.GifWindow, ...) using the same geometry as Maze.
+    """
+
+    def __init__(self, events, win, x1, y1, cell_size_x, cell_size_y):
+        self._events = events
+        self._win = win
+        self._x1 = x1
+        self._y1 = y1
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+
+    def _cell_bounds(self, i, j):
+        x1 = self._x1 + j * self._cell_size_x
+        y1 = self._y1 + i * self._cell_size_y
+        return x1, y1, x1 + self._cell_size_x, y1 + self._cell_size_y
+
+    def _center(self, i, j):
+        # Same rounding as Cell.draw_move
+        x1, y1, x2, y2 = self._cell_bounds(i, j)
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def _wall(self, i, j, direction):
+        x1, y1, x2, y2 = self._cell_bounds(i, j)
+        if direction == TOP:
+            return x1, y1, x2, y1
+        if direction == RIGHT:
+            return x2, y1, x2, y2
+        if direction == BOTTOM:
+            return x1, y2, x2, y2
+        return x1, y1, x1, y2
+
+    def draw_event(self, op, i, j, direction):
+        if op == BREAK:
+            self._win.draw_wall(*self._wall(i, j, direction), "#d9d9d9")
+        elif op == MOVE or op == UNDO:
+            di, dj = _STEP[direction]
+            self._win.draw_move(*self._center(i, j), *self._center(i + di, j + dj),
+                                "red" if op == MOVE else "gray")
+
+    def draw_grid(self, walls=None):
+        # Full grid as merged lines; by default the fully walled starting state
+        events = self._events
+        if walls is None:
+            walls = bytearray([ALL_WALLS]) * (events.num_rows * events.num_cols)
+        self._win.clear()
+        self._win.draw_segments(
+            wall_segments(walls, events.num_rows, events.num_cols, self._x1, self._y1,
+                          self._cell_size_x, self._cell_size_y),
+            "black",
+        )
+
+    def replay(self, steps_per_second=None, start=0, stop=None):
+        """
+        Draw events [start, stop) as an animation paced by a FrameScheduler;
+        events before start are applied in one jump without animation.
+        steps_per_second defaults to the live pace, max(20, cells).
+        """
+        from maze import FrameScheduler
+
+        events = self._events
+        if stop is None:
+            stop = len(events)
+        if steps_per_second is None:
+            steps_per_second = max(20, events.num_rows * events.num_cols)
+
+        # Skipped events only matter through the walls they broke and moves they made
+        walls = wall_state(events, start)
+        self.draw_grid(walls)
+        for op, i, j, direction in move_state(events, start):
+            self.draw_event(op, i, j, direction)
+        self._win.redraw()
+
+        scheduler = FrameScheduler(self._win, steps_per_second)
+        for n in range(start, stop):
+            self.draw_event(*events[n])
+            scheduler.step()
+        self._win.redraw()
+
+
+def move_state(events, stop=None):
+    """
+    The MOVE and UNDO events before index stop that still show: only the
+    last draw of each line, in the order of those last draws. Drawing these
+    gives the same pixels as drawing every event, since a line drawn again
+    covers everything its earlier draws did.
+    """
+    last = {}
+    for n, (op, i, j, direction) in enumerate(events):
+        if stop is not None and n >= stop:
+            break
+        if op == MOVE or op == UNDO:
+            key = (i, j, direction)
+            last.pop(key, None)
+            last[key] = op
+    return [(op, i, j, direction) for (i, j, direction), op in last.items()]
+
+
+def wall_state(events, stop=None):
+    # Flat wall bytearray after applying the BREAK events before index stop
+    num_cols = events.num_cols
+    walls = bytearray([ALL_WALLS]) * (events.num_rows * num_cols)
+    for n, (op, i, j, direction) in enumerate(events):
+        if stop is not None and n >= stop:
+            break
+        if op != BREAK:
+            continue
+        walls[i * num_cols + j] &= ~direction
+        di, dj = _STEP[direction]
+        ni, nj = i + di, j + dj
+        if 0 <= ni < events.num_rows and 0 <= nj < num_cols:
+            walls[ni * num_cols + nj] &= ~OPPOSITE[direction]
+    return walls
@@ -3,47 +3,16 @@
 generate_gifs.py
 
 Generates animated GIF demos of the maze generation and solving process
-for various maze sizes. The animation captures each drawing step by patching
-the Maze._animate method.
+for various maze sizes. The maze is built and solved headlessly with its
+event log switched on; the log is then rendered offscreen with Pillow by
+offscreen.render_animation, which rasterizes and encodes chunks of frames
+on a process pool, so no display or screen capture is needed.
 """
 
 import os
-from PIL import Image, ImageGrab
-from window import Maze, Window  # Import the Maze and Window classes
+from maze import Maze
+from offscreen import render_animation
 
-# Global list to store captured frames.
-frames = []
-
-def get_canvas_image(win):
-    """
-    Capture the current Tkinter canvas as a PIL image using ImageGrab.
-    Force a full update to ensure the canvas's size and position are current.
-    """
-    # Force a full update to capture current geometry.
-    win._Window__root.update()
-    canvas = win._Window__canvas
-    x = canvas.winfo_rootx()
-    y = canvas.winfo_rooty()
-    w = canvas.winfo_width()
-    h = canvas.winfo_height()
-    bbox = (x+10, y-25, x + w+310, y + h+320)
-    img = ImageGrab.grab(bbox)
-    return img
-
-# Save the original Maze._animate method.
-original_animate = Maze._animate
-
-def patched_animate(self):
-    """
-    Replacement for Maze._animate that calls the original animate behavior,
-    then captures the canvas image for GIF creation.
-    """
-    original_animate(self)
-    img = get_canvas_image(self._win)
-    frames.append(img)
-
-# Replace the original animate with our patched version.
-Maze._animate = patched_animate
 
 def generate_gif(num_rows, num_cols, output_filename, seed=None):
     """
@@ -57,9 +26,6 @@ def generate_gif(num_rows, num_cols, output_filename, seed=None):
     - output_filename: Where to save the resulting GIF.
     - seed: Optional seed for deterministic maze generation.
     """
-    global frames
-    frames = []  # Reset captured frames.
-    
     # Ensure the output directory exists.
     os.makedirs(os.path.dirname(output_filename), exist_ok=True)
     
@@ -74,32 +40,16 @@ def generate_gif(num_rows, num_cols, output_filename, seed=None):
     cell_size_x = available / num_cols
     cell_size_y = available / num_rows
     
-    # Create the window with a fixed square dimension and force its position.
-    win = Window(canvas_size, canvas_size)
-    win._Window__root.geometry(f"{canvas_size}x{canvas_size}+10+10")
-    win._Window__root.update_idletasks()
-    
-    # Create the maze using the computed margin and cell sizes.
-    maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y, win, seed)
-    
-    # Solve the maze (this also triggers _animate calls that capture frames).
+    # Create and solve the maze without drawing, recording every step.
+    maze = Maze(margin, margin, num_rows, num_cols, cell_size_x, cell_size_y,
+                seed=seed, record=True)
     maze.solve()
     
-    # Close the window and force destruction to avoid subsequent capture issues.
-    win.close()
-    win._Window__root.destroy()
-    
-    # Save captured frames as an animated GIF using Pillow.
-    duration = int(1000 / 30)  # 30 fps gives ~33ms per frame
-    frames[0].save(
-        output_filename,
-        save_all=True,
-        append_images=frames[1:],
-        optimize=False,
-        duration=duration,
-        loop=0
-    )
-    print(f"Saved GIF to {output_filename}")
+    # Render the recording offscreen at 30 fps; every animation frame is
+    # written as a delta.
+    frames = render_animation(maze.events, output_filename, canvas_size, canvas_size,
+                              margin, margin, cell_size_x, cell_size_y, fps=30)
+    print(f"Saved GIF to {output_filename} ({frames} frames)")
 
 def main():
     # Generate GIF for a small maze (3x3).
@@ -119,4 +69,4 @@ def main():
     )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,315 @@
+"""
+generators.py
+
+Maze generation algorithms. They work on flat cell indices
+(k = i * num_cols + j) and flat wall bytearrays using the bit layout from
+grid.py. Binary Tree and Sidewinder are vectorized with numpy and draw from
+counter-based Philox streams (rng.py), one per chunk of rows; Eller's
+algorithm works one row at a time in O(num_cols) memory.
+"""
+
+import random
+from grid import (
+    TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS, OPPOSITE, ROOT, load_numpy, require_numpy,
+)
+import rng as streams
+
+
+def carve_dfs(num_rows, num_cols, rng, start=0, walls=None, on_visit=None, stats=None):
+    """
+    Carve a perfect maze with a randomized depth-first search.
+
+    This is the iterative form of the original recursive generator and makes
+    exactly the same random choices, so a given seed yields the same maze.
+    Instead of an explicit stack, each visited cell remembers the direction
+    back to its parent, which keeps extra memory at one byte per cell.
+
+    - rng: anything with randrange (the random module or a random.Random).
+    - walls: optional flat wall bytearray to carve into.
+    - on_visit: optional callback(k, parent_k, bit) run when a cell is
+      entered; bit is the wall of parent_k that was opened (0 for the start).
+    - stats: optional MazeStats (stats.py); counts cells entered, walls
+      opened and every step back out of a dead end as a backtrack.
+    """
+    size = num_rows * num_cols
+    last_row = size - num_cols
+    last_col = num_cols - 1
+    randbelow = rng.randrange
+    back = bytearray(size)
+    cand = [0, 0, 0, 0]
+    bits = [0, 0, 0, 0]
+
+    k = start
+    back[k] = ROOT
+    if on_visit is not None:
+        on_visit(k, -1, 0)
+    if stats is not None:
+        stats.cells_visited += 1
+
+    while True:
+        # Collect unvisited neighbours in the order up, right, down, left
+        j = k % num_cols
+        n = 0
+        if k >= num_cols and not back[k - num_cols]:
+            cand[n] = k - num_cols
+            bits[n] = TOP
+            n += 1
+        if j < last_col and not back[k + 1]:
+            cand[n] = k + 1
+            bits[n] = RIGHT
+            n += 1
+        if k < last_row and not back[k + num_cols]:
+            cand[n] = k + num_cols
+            bits[n] = BOTTOM
+            n += 1
+        if j > 0 and not back[k - 1]:
+            cand[n] = k - 1
+            bits[n] = LEFT
+            n += 1
+
+        if n == 0:
+            # Dead end: step back towards the start cell
+            step = back[k]
+            if step == ROOT:
+                return
+            if stats is not None:
+                stats.backtracks += 1
+            if step == TOP:
+                k -= num_cols
+            elif step == RIGHT:
+                k += 1
+            elif step == BOTTOM:
+                k += num_cols
+            else:
+                k -= 1
+            continue
+
+        c = randbelow(n)
+        next_k = cand[c]
+        bit = bits[c]
+        opposite = OPPOSITE[bit]
+        if walls is not None:
+            walls[k] &= ~bit
+            walls[next_k] &= ~opposite
+        back[next_k] = opposite
+        if on_visit is not None:
+            on_visit(next_k, k, bit)
+        if stats is not None:
+            stats.cells_visited += 1
+            stats.walls_broken += 1
+        k = next_k
+
+
+# Rows processed per vectorized step. Each chunk draws from its own random
+# stream, so chunks can be built in any order; fixed so a seed always
+# yields the same maze.
+_CHUNK_ROWS = 256
+
+
+def _wall_array(num_rows, num_cols):
+    # Fully walled bytearray plus a (rows, cols) numpy view sharing its memory
+    np = load_numpy()
+    walls = bytearray([ALL_WALLS]) * (num_rows * num_cols)
+    return walls, np.frombuffer(walls, dtype=np.uint8).reshape(num_rows, num_cols)
+
+
+def _random_bits(rng, num_rows, num_cols):
+    # (rows, cols) uint8 array of fair coin flips, eight per random byte
+    np = load_numpy()
+    size = num_rows * num_cols
+    packed = np.frombuffer(rng.bytes((size + 7) // 8), dtype=np.uint8)
+    return np.unpackbits(packed, count=size).reshape(num_rows, num_cols)
+
+
+def binary_tree(num_rows, num_cols, seed=None, rng=None):
+    """
+    Every cell opens its top or its right wall at random. The top row can
+    only go right and the last column only up, which leaves a perfect maze.
+    Randomness comes from per-chunk Philox streams of seed; rng is unused.
+    """
+    require_numpy("the 'binary_tree' generator")
+    key = streams.seed_key(seed)
+    walls, grid = _wall_array(num_rows, num_cols)
+    for r0 in range(0, num_rows, _CHUNK_ROWS):
+        r1 = min(r0 + _CHUNK_ROWS, num_rows)
+        chunk_rng = streams.generator(key, r0 // _CHUNK_ROWS)
+        # Wall bits are cleared with XOR on 0/1 masks, which beats boolean indexing
+        up = _random_bits(chunk_rng, r1 - r0, num_cols)
+        up[:, -1] = 1
+        if r0 == 0:
+            up[0, :] = 0
+        right = 1 - up
+        right[:, -1] = 0
+
+        block = grid[r0:r1]
+        block ^= up             # TOP
+        block ^= right << 1     # RIGHT
+        block[:, 1:] ^= right[:, :-1] << 3  # LEFT of the right-hand neighbour
+        # The cell above each upward opening loses its bottom wall
+        if r0 == 0:
+            grid[:r1 - 1] ^= up[1:] << 2
+        else:
+            grid[r0 - 1:r1 - 1] ^= up << 2
+    return walls
+
+
+def sidewinder(num_rows, num_cols, seed=None, rng=None):
+    """
+    The top row is one open corridor. Every other row is cut into runs of
+    random length, and each run opens its top wall at one random cell.
+    Randomness comes from per-chunk Philox streams of seed; rng is unused.
+    """
+    np = require_numpy("the 'sidewinder' generator")
+    key = streams.seed_key(seed)
+    walls, grid = _wall_array(num_rows, num_cols)
+    grid[0, :-1] ^= RIGHT
+    grid[0, 1:] ^= LEFT
+    for r0 in range(1, num_rows, _CHUNK_ROWS):
+        r1 = min(r0 + _CHUNK_ROWS, num_rows)
+        chunk_rng = streams.generator(key, (r0 - 1) // _CHUNK_ROWS)
+        close = _random_bits(chunk_rng, r1 - r0, num_cols)
+        close[:, -1] = 1
+        east = 1 - close[:, :-1]
+        block = grid[r0:r1]
+        block[:, :-1] ^= east << 1  # RIGHT
+        block[:, 1:] ^= east << 3   # LEFT
+
+        # Runs end at closing cells and never span rows (the last column closes)
+        ends = np.flatnonzero(close)
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        picks = starts + (chunk_rng.random(len(ends)) * (ends - starts + 1)).astype(np.int64)
+        block.reshape(-1)[picks] ^= TOP
+        grid[r0 - 1:r1 - 1].reshape(-1)[picks] ^= BOTTOM
+    return walls
+
+
+def eller_rows(num_rows, num_cols, rng):
+    """
+    Eller's algorithm: yield the maze one row of wall bytes at a time,
+    keeping only O(num_cols) state. rng is a random.Random (or the module).
+    """
+    labels = list(range(num_cols))
+    next_label = num_cols
+    top_open = [False] * num_cols
+    for i in range(num_rows):
+        row = bytearray([ALL_WALLS]) * num_cols
+        for j in range(num_cols):
+            if top_open[j]:
+                row[j] ^= TOP
+        last = i == num_rows - 1
+
+        # Join neighbouring cells from different sets (all of them on the last row)
+        members = {}
+        for j, label in enumerate(labels):
+            members.setdefault(label, []).append(j)
+        for j in range(num_cols - 1):
+            a, b = labels[j], labels[j + 1]
+            if a != b and (last or rng.random() < 0.5):
+                row[j] ^= RIGHT
+                row[j + 1] ^= LEFT
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                for col in members[b]:
+                    labels[col] = a
+                members[a].extend(members.pop(b))
+
+        if last:
+            yield row
+            return
+
+        # Every set continues downwards through at least one cell
+        top_open = [False] * num_cols
+        for cols in members.values():
+            down = [col for col in cols if rng.random() < 0.5]
+            if not down:
+                down = [cols[rng.randrange(len(cols))]]
+            for col in down:
+                row[col] ^= BOTTOM
+                top_open[col] = True
+        for j in range(num_cols):
+            if not top_open[j]:
+                labels[j] = next_label
+                next_label += 1
+        yield row
+
+
+def eller(num_rows, num_cols, seed=None, rng=None):
+    if rng is None:
+        rng = random.Random(seed)
+    walls = bytearray()
+    for row in eller_rows(num_rows, num_cols, rng):
+        walls += row
+    return walls
+
+
+def dfs(num_rows, num_cols, seed=None, rng=None):
+    if rng is None:
+        rng = random.Random(seed)
+    walls = bytearray([ALL_WALLS]) * (num_rows * num_cols)
+    carve_dfs(num_rows, num_cols, rng, walls=walls)
+    return walls
+
+
+def tiled(num_rows, num_cols, seed=None, rng=None):
+    """
+    DFS tiles stitched together (tiled.py); rng is unused. The tiles are
+    carved in-process, so building a Maze never starts a process pool; call
+    tiled.generate_tiled with workers for parallel carving of the same maze.
+    """
+    from tiled import generate_tiled
+    return generate_tiled(num_rows, num_cols, seed, workers=1)
+
+
+ALGORITHMS = {
+    "dfs": dfs,
+    "binary_tree": binary_tree,
+    "sidewinder": sidewinder,
+    "eller": eller,
+    "tiled": tiled,
+}
+
+
+def generate(algorithm, num_rows, num_cols, seed=None, rng=None):
+    """
+    Build a maze with the named algorithm and return its flat wall bytearray.
+    rng (random.Random or rng.CounterRandom) overrides the seed for the
+    sequential generators, dfs and eller.
+    """
+    try:
+        build = ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(
+            f"unknown maze algorithm {algorithm!r}, expected one of {sorted(ALGORITHMS)}"
+        ) from None
+    return build(num_rows, num_cols, seed, rng)
+
+
+def stream_rows(num_rows, num_cols, seed=None):
+    """
+    Yield a maze one row of wall bytes at a time, with the entrance and exit
+    already open. Peak memory is O(num_cols), so the maze may be far larger
+    than RAM. The seed is used the same way Maze(seed=...) uses it, so the
+    rows match Maze(..., algorithm="eller", seed=seed).
+    """
+    last = num_rows - 1
+    for i, row in enumerate(eller_rows(num_rows, num_cols, random.Random(seed))):
+        if i == 0:
+            row[0] &= ~TOP
+        if i == last:
+            row[-1] &= ~BOTTOM
+        yield row
+
+
+def write_stream(out, num_rows, num_cols, seed=None):
+    """
+    Stream a maze into a binary file object or a connected socket, row by
+    row, and return the number of bytes written.
+    """
+    send = getattr(out, "sendall", None) or out.write
+    written = 0
+    for row in stream_rows(num_rows, num_cols, seed):
+        send(row)
+        written += len(row)
+    return written
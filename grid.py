@@ -0,0 +1,219 @@
+"""
+grid.py
+
+Compact storage for maze cells. Instead of one Cell object per grid square,
+a CompactGrid keeps a single byte per cell holding the wall bitmask and a
+separate bitset of visited flags. Cells are still reachable through
+grid[i][j], which returns a lightweight view exposing the same attributes
+as Cell (has_top_wall, visited, ...), so code written against the
+list-of-lists layout keeps working.
+"""
+
+# Wall bits stored in the low nibble of each cell byte.
+TOP = 1
+RIGHT = 2
+BOTTOM = 4
+LEFT = 8
+ALL_WALLS = TOP | RIGHT | BOTTOM | LEFT
+
+OPPOSITE = {TOP: BOTTOM, RIGHT: LEFT, BOTTOM: TOP, LEFT: RIGHT}
+
+# Marks the start cell in the back-pointer arrays of the DFS generator and
+# the solvers, which otherwise hold the wall bit leading back to the parent.
+ROOT = 16
+
+_numpy = False  # not looked up yet
+
+
+def load_numpy():
+    # numpy, or None if it is not installed. It is imported on first use
+    # rather than at module load, so code paths that never need it (the
+    # DFS generator, batch workers) start without paying for the import.
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # callers fall back to pure Python or raise
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def require_numpy(feature):
+    # load_numpy() for code that has no pure Python fallback
+    np = load_numpy()
+    if np is None:
+        raise RuntimeError(f"numpy is required for {feature}")
+    return np
+
+
+def wall_array(np, walls, size):
+    # uint8 array of the first size cells of a flat wall buffer: a view of a
+    # bytes-like buffer, or a copy of any other sequence (a mazefile.NibbleArray)
+    try:
+        return np.frombuffer(walls, dtype=np.uint8, count=size)
+    except TypeError:
+        return np.fromiter(walls, dtype=np.uint8, count=size)
+
+
+def _wall_property(bit):
+    def getter(self):
+        return bool(self._grid.walls[self._index] & bit)
+
+    def setter(self, value):
+        self._grid.set_wall(self._index, bit, value)
+
+    return property(getter, setter)
+
+
+class CellView:
+    """Cell-like accessor for one square of a CompactGrid."""
+
+    __slots__ = ("_grid", "_index")
+
+    def __init__(self, grid, index):
+        self._grid = grid
+        self._index = index
+
+    has_top_wall = _wall_property(TOP)
+    has_right_wall = _wall_property(RIGHT)
+    has_bottom_wall = _wall_property(BOTTOM)
+    has_left_wall = _wall_property(LEFT)
+
+    @property
+    def visited(self):
+        return self._grid.is_visited(self._index)
+
+    @visited.setter
+    def visited(self, value):
+        self._grid.set_visited(self._index, value)
+
+    # Compact grids are headless, so drawing is a no-op (like Cell with win=None).
+    def draw(self, x1, y1, x2, y2):
+        return
+
+    def draw_move(self, to_cell, undo=False):
+        return
+
+
+class _RowView:
+    __slots__ = ("_grid", "_row")
+
+    def __init__(self, grid, row):
+        self._grid = grid
+        self._row = row
+
+    def __len__(self):
+        return self._grid.num_cols
+
+    def __getitem__(self, j):
+        num_cols = self._grid.num_cols
+        if j < 0:
+            j += num_cols
+        if not 0 <= j < num_cols:
+            raise IndexError("column index out of range")
+        return CellView(self._grid, self._row * num_cols + j)
+
+
+class CompactGrid:
+    """num_rows x num_cols cells stored as a wall bytearray plus a visited bitset."""
+
+    def __init__(self, num_rows, num_cols, walls=None):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        size = num_rows * num_cols
+        if walls is None:
+            walls = bytearray([ALL_WALLS]) * size
+        elif len(walls) != size:
+            raise ValueError(
+                f"wall buffer has {len(walls)} cells, expected {size}"
+            )
+        self.walls = walls
+        self.visited = bytearray((size + 7) >> 3)
+
+    def __len__(self):
+        return self.num_rows
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.num_rows
+        if not 0 <= i < self.num_rows:
+            raise IndexError("row index out of range")
+        return _RowView(self, i)
+
+    def index(self, i, j):
+        return i * self.num_cols + j
+
+    def has_wall(self, k, bit):
+        return bool(self.walls[k] & bit)
+
+    def set_wall(self, k, bit, value):
+        if value:
+            self.walls[k] |= bit
+        else:
+            self.walls[k] &= ~bit & ALL_WALLS
+
+    def is_visited(self, k):
+        return bool(self.visited[k >> 3] & (1 << (k & 7)))
+
+    def set_visited(self, k, value):
+        if value:
+            self.visited[k >> 3] |= 1 << (k & 7)
+        else:
+            self.visited[k >> 3] &= ~(1 << (k & 7)) & 0xFF
+
+    def reset_visited(self):
+        self.visited[:] = bytes(len(self.visited))
+
+    def nbytes(self):
+        return len(self.walls) + len(self.visited)
+
+
+
+def walls_from_cells(cells):
+    # Pack a list-of-lists of Cell objects into a flat wall bytearray
+    walls = bytearray()
+    for row in cells:
+        for cell in row:
+            walls.append(
+                (TOP if cell.has_top_wall else 0)
+                | (RIGHT if cell.has_right_wall else 0)
+                | (BOTTOM if cell.has_bottom_wall else 0)
+                | (LEFT if cell.has_left_wall else 0)
+            )
+    return walls
+
+
+def wall_segments(walls, rows, cols, x0, y0, cell_size_x, cell_size_y):
+    # Drawable (x1, y1, x2, y2) lines covering every wall once, with runs of
+    # collinear walls merged into a single line
+    segments = []
+
+    # Horizontal grid lines: top walls of each row, then the last row's bottoms
+    for r in range(rows + 1):
+        base, bit = (r * cols, TOP) if r < rows else ((rows - 1) * cols, BOTTOM)
+        y = y0 + r * cell_size_y
+        start = None
+        for c in range(cols + 1):
+            present = c < cols and walls[base + c] & bit
+            if present and start is None:
+                start = c
+            elif not present and start is not None:
+                segments.append((x0 + start * cell_size_x, y,
+                                 x0 + c * cell_size_x, y))
+                start = None
+
+    # Vertical grid lines: left walls of each column, then the last column's rights
+    for c in range(cols + 1):
+        offset, bit = (c, LEFT) if c < cols else (cols - 1, RIGHT)
+        x = x0 + c * cell_size_x
+        start = None
+        for r in range(rows + 1):
+            present = r < rows and walls[r * cols + offset] & bit
+            if present and start is None:
+                start = r
+            elif not present and start is not None:
+                segments.append((x, y0 + start * cell_size_y,
+                                 x, y0 + r * cell_size_y))
+                start = None
+    return segments
@@ -0,0 +1,528 @@
+"""
+maze.py
+
+The maze itself: Maze, Cell, Point, Line and FrameScheduler. Nothing here
+imports tkinter or Pillow, so headless code (batch workers, solvers, file
+conversion) can use mazes on machines without Tk and without paying for
+its import. Drawing goes through whatever window object is passed in;
+window.Window is the Tk one and re-exports everything defined here.
+"""
+
+import random
+import hashlib
+from grid import (
+    CompactGrid, TOP, RIGHT, BOTTOM, LEFT, OPPOSITE, walls_from_cells, wall_segments,
+)
+from generators import carve_dfs
+import generators
+import solvers
+import analysis
+import mazefile
+from events import EventLog, VISIT, BREAK, MOVE, UNDO, direction_between
+from pathindex import PathIndex
+from stats import MazeStats, phase
+from rng import CounterRandom
+
+_WALL_ATTRS = {
+    TOP: "has_top_wall",
+    RIGHT: "has_right_wall",
+    BOTTOM: "has_bottom_wall",
+    LEFT: "has_left_wall",
+}
+
+
+def _make_rng(seed, rng):
+    # Each maze owns its RNG so mazes can be built side by side safely.
+    # The default Mersenne Twister keeps existing seeds' layouts; "philox"
+    # uses a counter-based stream (rng.py) that workers can reproduce.
+    if rng is None:
+        return random.Random(seed)
+    if rng == "philox":
+        return CounterRandom(seed)
+    raise ValueError(f"unknown rng {rng!r}, expected None or 'philox'")
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+class Line:
+    def __init__(self, p1, p2):
+        self.p1 = p1
+        self.p2 = p2
+    
+    def draw(self, canvas, fill_color):
+        canvas.create_line(
+            self.p1.x, self.p1.y, self.p2.x, self.p2.y, 
+            fill=fill_color, width=2
+        )
+
+class FrameScheduler:
+    # Groups algorithm steps into frames so an animation runs at a target
+    # rate (steps per second) whatever the window's frame rate is
+    def __init__(self, win, steps_per_second):
+        self._win = win
+        self._steps_per_frame = self.steps_per_frame(steps_per_second, win.fps)
+        self._interval = self._steps_per_frame / steps_per_second
+        self._pending = 0
+
+    @staticmethod
+    def steps_per_frame(steps_per_second, fps):
+        return max(1, round(steps_per_second / fps))
+
+    def step(self):
+        self._pending += 1
+        if self._pending >= self._steps_per_frame:
+            self._pending = 0
+            self._win.wait_frame(self._interval)
+
+class Cell:
+    def __init__(self, win=None):
+        self.has_left_wall = True
+        self.has_right_wall = True
+        self.has_top_wall = True
+        self.has_bottom_wall = True
+        self.visited = False
+        self._x1 = None
+        self._x2 = None
+        self._y1 = None
+        self._y2 = None
+        self._win = win
+        
+    def place(self, x1, y1, x2, y2):
+        self._x1 = x1
+        self._x2 = x2
+        self._y1 = y1
+        self._y2 = y2
+
+    def draw(self, x1, y1, x2, y2):
+        self.place(x1, y1, x2, y2)
+        
+        if self._win is None:
+            return
+            
+        # Draw all walls, using the background color for removed walls
+        self._win.draw_wall(x1, y1, x1, y2, "black" if self.has_left_wall else "#d9d9d9")
+        self._win.draw_wall(x1, y1, x2, y1, "black" if self.has_top_wall else "#d9d9d9")
+        self._win.draw_wall(x2, y1, x2, y2, "black" if self.has_right_wall else "#d9d9d9")
+        self._win.draw_wall(x1, y2, x2, y2, "black" if self.has_bottom_wall else "#d9d9d9")
+
+    def draw_move(self, to_cell, undo=False):
+        if self._win is None:
+            return
+            
+        # Calculate center points of both cells
+        from_x = (self._x1 + self._x2) // 2
+        from_y = (self._y1 + self._y2) // 2
+        to_x = (to_cell._x1 + to_cell._x2) // 2
+        to_y = (to_cell._y1 + to_cell._y2) // 2
+        
+        # Draw the move, or recolor it gray when backtracking
+        self._win.draw_move(from_x, from_y, to_x, to_y, "gray" if undo else "red")
+
+class Maze:
+    def __init__(
+            self,
+            x1,
+            y1,
+            num_rows,
+            num_cols,
+            cell_size_x,
+            cell_size_y,
+            win=None,
+            seed=None,
+            compact=False,
+            algorithm="dfs",
+            animation_duration=None,
+            record=False,
+            instrument=False,
+            rng=None,
+        ):
+        if compact and win is not None:
+            raise ValueError("compact storage is only supported for headless mazes")
+        if algorithm not in generators.ALGORITHMS:
+            raise ValueError(
+                f"unknown maze algorithm {algorithm!r}, "
+                f"expected one of {sorted(generators.ALGORITHMS)}"
+            )
+        self._rng = _make_rng(seed, rng)
+        self._rng_kind = rng
+        self._seed = seed
+
+        self._x1 = x1
+        self._y1 = y1
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+        self._win = win
+        self._compact = compact
+        self._algorithm = algorithm
+        self._cells = []
+        self._path_index = None
+        self._walls_key = None
+        # Flat walls of a Cell-backed maze, kept once generation is done
+        self._flat_walls = None
+        # Optional log of generation and solving steps for later replay
+        self.events = EventLog(num_rows, num_cols) if record else None
+        # Opt-in counters and phase timers: True for a fresh MazeStats, or a
+        # MazeStats to share (e.g. MazeStats(profile=True))
+        if instrument is True:
+            instrument = MazeStats()
+        self.stats = instrument or None
+        if self.stats is not None and win is not None and hasattr(win, "stats"):
+            win.stats = self.stats
+        self._scheduler = None
+        if win is not None:
+            total_cells = num_rows * num_cols
+            if animation_duration is None:
+                # Same pace as before: about max(20, cells) steps per second
+                rate = max(20, total_cells)
+            else:
+                # Generation and solving each take about one step per cell
+                rate = 2 * total_cells / animation_duration
+            self._scheduler = FrameScheduler(win, rate)
+        
+        with phase(self.stats, "generate"):
+            self._create_cells()
+            if algorithm == "dfs":
+                self._break_walls(0, 0)  # DFS maze generation
+            else:
+                self._load_walls(generators.generate(
+                    algorithm, num_rows, num_cols, self._seed, self._rng
+                ))
+            self._break_entrance_and_exit()  # Open the exterior at entrance/exit
+            self._reset_cells_visited()      # Reset visited flags for solving
+        if not compact:
+            # The walls no longer change, so the flat copy can be kept
+            self._flat_walls = walls_from_cells(self._cells)
+    
+    @classmethod
+    def _from_walls(cls, num_rows, num_cols, walls, seed=None, algorithm="dfs", rng=None):
+        # Wrap an existing wall buffer in a headless compact maze, skipping generation
+        maze = cls.__new__(cls)
+        # Only generation draws from _rng; the kind is kept for save()
+        maze._rng = random.Random(seed)
+        maze._rng_kind = rng
+        maze._seed = seed
+        maze._x1 = 0
+        maze._y1 = 0
+        maze._num_rows = num_rows
+        maze._num_cols = num_cols
+        maze._cell_size_x = 1
+        maze._cell_size_y = 1
+        maze._win = None
+        maze._compact = True
+        maze._algorithm = algorithm
+        maze._scheduler = None
+        maze.events = None
+        maze.stats = None
+        maze._path_index = None
+        maze._walls_key = None
+        maze._flat_walls = None
+        maze._cells = CompactGrid(num_rows, num_cols, walls)
+        return maze
+
+    def save(self, path):
+        mazefile.save(
+            path, self._wall_buffer(), self._num_rows, self._num_cols,
+            self._seed, self._algorithm, self._rng_kind,
+        )
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        # With use_mmap the walls stay in the (read-only) mapped file
+        header, walls = mazefile.load(path, use_mmap)
+        return cls._from_walls(
+            header["num_rows"], header["num_cols"], walls,
+            header["seed"], header["algorithm"], header["rng"],
+        )
+
+    def _break_walls(self, i, j):
+        # Iterative DFS maze generation starting from cell (i, j)
+        start = i * self._num_cols + j
+        if self._compact:
+            on_visit = self._record_carve if self.events is not None else None
+            carve_dfs(self._num_rows, self._num_cols, self._rng, start,
+                      walls=self._cells.walls, on_visit=on_visit, stats=self.stats)
+        else:
+            carve_dfs(self._num_rows, self._num_cols, self._rng, start,
+                      on_visit=self._carve_cell, stats=self.stats)
+
+    def _load_walls(self, walls):
+        # Adopt a flat wall bytearray produced by one of the other generators
+        if self.events is not None or self.stats is not None:
+            # Record the finished layout as one break per interior opening
+            opened = 0
+            for k in range(self._num_rows * self._num_cols):
+                i, j = divmod(k, self._num_cols)
+                if not walls[k] & RIGHT and j < self._num_cols - 1:
+                    opened += 1
+                    if self.events is not None:
+                        self.events.append(BREAK, i, j, RIGHT)
+                if not walls[k] & BOTTOM and i < self._num_rows - 1:
+                    opened += 1
+                    if self.events is not None:
+                        self.events.append(BREAK, i, j, BOTTOM)
+            if self.stats is not None:
+                # These generators fill whole rows at once: each cell is
+                # visited once and none is ever backed out of
+                self.stats.cells_visited += self._num_rows * self._num_cols
+                self.stats.walls_broken += opened
+        if self._compact:
+            self._cells.walls = walls
+            return
+        k = 0
+        for i in range(self._num_rows):
+            for j in range(self._num_cols):
+                cell = self._cells[i][j]
+                w = walls[k]
+                cell.has_top_wall = bool(w & TOP)
+                cell.has_right_wall = bool(w & RIGHT)
+                cell.has_bottom_wall = bool(w & BOTTOM)
+                cell.has_left_wall = bool(w & LEFT)
+                self._draw_cell(i, j)
+                k += 1
+
+    def _record_carve(self, k, parent_k, bit):
+        i, j = divmod(k, self._num_cols)
+        if parent_k >= 0:
+            parent_i, parent_j = divmod(parent_k, self._num_cols)
+            self.events.append(BREAK, parent_i, parent_j, bit)
+        self.events.append(VISIT, i, j)
+
+    def _carve_cell(self, k, parent_k, bit):
+        # Open the wall between a newly visited cell and its parent, then draw it
+        if self.events is not None:
+            self._record_carve(k, parent_k, bit)
+        i, j = divmod(k, self._num_cols)
+        if parent_k >= 0:
+            parent = self._cells[parent_k // self._num_cols][parent_k % self._num_cols]
+            setattr(parent, _WALL_ATTRS[bit], False)
+            setattr(self._cells[i][j], _WALL_ATTRS[OPPOSITE[bit]], False)
+        self._draw_cell(i, j)
+
+    def _create_cells(self):
+        if self._compact:
+            # One wall byte per cell plus a visited bitset; nothing to draw
+            self._cells = CompactGrid(self._num_rows, self._num_cols)
+            return
+
+        # Initialize the grid of cells
+        self._cells = [[Cell(self._win) for col in range(self._num_cols)] 
+                      for row in range(self._num_rows)]
+        
+        # Position each cell, then draw the whole grid in one batch
+        for i in range(self._num_rows):
+            for j in range(self._num_cols):
+                self._cells[i][j].place(*self._cell_bounds(i, j))
+        self.draw()
+    
+    def _cell_bounds(self, i, j):
+        # Calculate the cell's position
+        x1 = self._x1 + j * self._cell_size_x
+        y1 = self._y1 + i * self._cell_size_y
+        return x1, y1, x1 + self._cell_size_x, y1 + self._cell_size_y
+
+    def _draw_cell(self, i, j):
+        # Draw the cell
+        self._cells[i][j].draw(*self._cell_bounds(i, j))
+        self._animate()
+
+    def draw(self):
+        # Redraw the whole maze, drawing each wall once and merging collinear walls
+        if self._win is None:
+            return
+        with phase(self.stats, "draw"):
+            self._win.clear()
+            self._win.draw_segments(self._wall_segments(), "black")
+            self._win.redraw()
+
+    def _wall_segments(self):
+        return wall_segments(
+            self._wall_buffer(), self._num_rows, self._num_cols,
+            self._x1, self._y1, self._cell_size_x, self._cell_size_y,
+        )
+
+    def _animate(self):
+        if self._scheduler is None:
+            return
+        self._scheduler.step()
+
+    def _reset_cells_visited(self):
+        if self._compact:
+            self._cells.reset_visited()
+            return
+
+        # Reset visited flag for all cells
+        for i in range(self._num_rows):
+            for j in range(self._num_cols):
+                self._cells[i][j].visited = False
+
+    def solve(self, strategy=None):
+        with phase(self.stats, "solve"):
+            return self._solve(strategy)
+
+    def _solve(self, strategy):
+        # With a strategy, run one of the iterative solvers and return a SolveResult
+        if strategy is not None:
+            return self._solve_with(strategy)
+
+        # The recursive solver needs headroom on larger mazes
+        import sys
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+        self._reset_cells_visited()  # Reset visited flags for solving
+        return self._solve_r(0, 0)
+
+    def path_index(self):
+        # Built on first use from the finished maze and kept for later queries
+        if self._path_index is None:
+            self._path_index = PathIndex(
+                self._wall_buffer(), self._num_rows, self._num_cols
+            )
+        return self._path_index
+
+    def distance(self, a, b):
+        # Number of moves between cells a and b, given as (i, j)
+        return self.path_index().distance(a, b)
+
+    def path(self, a, b):
+        # Cells from a to b inclusive, without drawing anything
+        return self.path_index().path(a, b)
+
+    def solve_many(self, pairs, cache=None):
+        # Headless SolveResults for many ((i, j), (i, j)) pairs; see solvers.solve_many
+        return solvers.solve_many(
+            self._wall_buffer(), self._num_rows, self._num_cols, pairs,
+            cache, self.walls_key(),
+        )
+
+    def walls_key(self):
+        # Digest of the wall layout, so equal mazes share SolveCache entries
+        if self._walls_key is None:
+            # Always the packed nibbles (as in a .maze file), so a loaded maze
+            # and the maze it was saved from get the same key
+            walls = self._wall_buffer()
+            if isinstance(walls, mazefile.NibbleArray):
+                data = walls.packed()
+            else:
+                data = mazefile.pack(walls)
+            digest = hashlib.blake2b(data, digest_size=16)
+            digest.update(f"{self._num_rows}x{self._num_cols}".encode("ascii"))
+            self._walls_key = digest.hexdigest()
+        return self._walls_key
+
+    def analyze(self, start=(0, 0), goal=None, paths=True):
+        # Dead ends, junctions, solution length and other difficulty metrics;
+        # paths=False skips the solution and corridor lengths (see analysis.analyze)
+        return analysis.analyze(
+            self._wall_buffer(), self._num_rows, self._num_cols, start, goal, paths
+        )
+
+    def show(self, win):
+        # Explore the finished maze in win with zoom, pan and culled drawing
+        win.show_maze(self._wall_buffer(), self._num_rows, self._num_cols)
+
+    def _wall_buffer(self):
+        # Flat wall bitmasks for the solvers; compact grids are used as-is
+        if self._compact:
+            return self._cells.walls
+        if self._flat_walls is not None:
+            return self._flat_walls
+        return walls_from_cells(self._cells)
+
+    def _solve_with(self, strategy):
+        result = solvers.solve(
+            self._wall_buffer(), self._num_rows, self._num_cols, strategy
+        )
+        if self.stats is not None:
+            self.stats.cells_visited += result.nodes_expanded
+        # Draw the final path only, not the search
+        path = result.path
+        for (i, j), (next_i, next_j) in zip(path, path[1:]):
+            self._draw_move(i, j, next_i, next_j)
+        if path:
+            self._animate()
+        return result
+    
+    def _draw_move(self, i, j, next_i, next_j, undo=False):
+        if self.events is not None:
+            direction = direction_between(i, j, next_i, next_j)
+            self.events.append(UNDO if undo else MOVE, i, j, direction)
+        if undo and self.stats is not None:
+            self.stats.backtracks += 1
+        self._cells[i][j].draw_move(self._cells[next_i][next_j], undo)
+
+    def _solve_r(self, i, j):
+        self._animate()
+        self._cells[i][j].visited = True
+        if self.stats is not None:
+            self.stats.cells_visited += 1
+        
+        # If we reached the end cell (bottom-right)
+        if i == self._num_rows - 1 and j == self._num_cols - 1:
+            return True
+            
+        # Try each direction (up, right, down, left)
+        # Up
+        if (i > 0 and 
+            not self._cells[i][j].has_top_wall and 
+            not self._cells[i-1][j].visited):
+            self._draw_move(i, j, i-1, j)
+            if self._solve_r(i-1, j):
+                return True
+            self._draw_move(i, j, i-1, j, True)  # undo
+            
+        # Right
+        if (j < self._num_cols - 1 and 
+            not self._cells[i][j].has_right_wall and 
+            not self._cells[i][j+1].visited):
+            self._draw_move(i, j, i, j+1)
+            if self._solve_r(i, j+1):
+                return True
+            self._draw_move(i, j, i, j+1, True)  # undo
+            
+        # Down
+        if (i < self._num_rows - 1 and 
+            not self._cells[i][j].has_bottom_wall and 
+            not self._cells[i+1][j].visited):
+            self._draw_move(i, j, i+1, j)
+            if self._solve_r(i+1, j):
+                return True
+            self._draw_move(i, j, i+1, j, True)  # undo
+            
+        # Left
+        if (j > 0 and 
+            not self._cells[i][j].has_left_wall and 
+            not self._cells[i][j-1].visited):
+            self._draw_move(i, j, i, j-1)
+            if self._solve_r(i, j-1):
+                return True
+            self._draw_move(i, j, i, j-1, True)  # undo
+        
+        return False
+
+    def _break_entrance_and_exit(self):
+        last_i = self._num_rows - 1
+        last_j = self._num_cols - 1
+        if self.events is not None:
+            self.events.append(BREAK, 0, 0, TOP)
+            self.events.append(BREAK, last_i, last_j, BOTTOM)
+        if self.stats is not None:
+            self.stats.walls_broken += 2
+
+        # For a 1x1 maze, remove both top and bottom walls.
+        if self._num_rows == 1 and self._num_cols == 1:
+            cell = self._cells[0][0]
+            cell.has_top_wall = False
+            cell.has_bottom_wall = False
+            self._draw_cell(0, 0)
+        else:
+            # For entrance cell (top-left): only remove the top wall.
+            self._cells[0][0].has_top_wall = False
+            self._draw_cell(0, 0)
+            
+            # For exit cell (bottom-right): only remove the bottom wall.
+            self._cells[last_i][last_j].has_bottom_wall = False
+            self._draw_cell(last_i, last_j)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+"""
+maze_bench.py
+
+Benchmarks for maze construction, generation, solving and rendering across
+maze sizes. Every case is timed with tracing off, then run once more under
+tracemalloc to record its peak memory; setup (building the maze a case works
+on) is never measured, and neither are lazy imports (numpy, see
+grid.load_numpy), which an untimed run on a tiny maze loads first. Results are written as JSON so runs from different
+commits can be compared.
+
+Usage:
+    python -m maze_bench --sizes 10,100,500,1000,2000 --out bench.json
+    python -m maze_bench --sizes 100,500 --compare bench.json
+    python -m maze_bench --sizes "" --imports
+    python -m maze_bench --cases solve_bfs,solve_bidirectional,solve_dead_end \
+        --algorithm sidewinder
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from grid import CompactGrid
+from maze import Maze
+
+DEFAULT_SIZES = (10, 100, 500, 1000, 2000)
+# Maze.solve() without a strategy recurses once per step along the current
+# path and raises the recursion limit to 10000, so solve_recursive only runs
+# on mazes of at most that many cells
+RECURSIVE_MAX_CELLS = 10000
+# Modules whose cold import time is tracked; maze is what headless workers load
+IMPORT_MODULES = ("maze", "batch", "window")
+
+
+class StubWindow:
+    """Window stand-in that counts drawing calls instead of talking to Tk."""
+
+    def __init__(self):
+        self.fps = 60
+        self.calls = 0
+
+    def draw_line(self, line, fill_color):
+        self.calls += 1
+
+    def draw_wall(self, x1, y1, x2, y2, fill_color):
+        self.calls += 1
+
+    def draw_move(self, x1, y1, x2, y2, fill_color):
+        self.calls += 1
+
+    def draw_segments(self, segments, fill_color):
+        for _ in segments:
+            self.calls += 1
+
+    def clear(self):
+        pass
+
+    def redraw(self):
+        pass
+
+    def wait_frame(self, interval):
+        pass
+
+
+# Each case takes (rows, cols, seed, algorithm), does its untimed setup and
+# returns the function to measure.
+
+def _construct(rows, cols, seed, algorithm):
+    return lambda: Maze(0, 0, rows, cols, 10, 10, seed=seed, algorithm=algorithm)
+
+
+def _construct_compact(rows, cols, seed, algorithm):
+    return lambda: Maze(0, 0, rows, cols, 10, 10, seed=seed, compact=True,
+                        algorithm=algorithm)
+
+
+def _break_walls(rows, cols, seed, algorithm):
+    # Generation alone, on a fresh fully walled grid
+    maze = Maze(0, 0, 1, 1, 10, 10, seed=seed, compact=True)
+    maze._num_rows = rows
+    maze._num_cols = cols
+    maze._cells = CompactGrid(rows, cols)
+    return lambda: maze._break_walls(0, 0)
+
+
+def _solver(strategy):
+    def case(rows, cols, seed, algorithm):
+        maze = Maze(0, 0, rows, cols, 10, 10, seed=seed, compact=True,
+                    algorithm=algorithm)
+        return lambda: maze.solve(strategy=strategy)
+    return case
+
+
+def _solve_recursive(rows, cols, seed, algorithm):
+    # The original recursive solver, as a baseline for the iterative ones
+    maze = Maze(0, 0, rows, cols, 10, 10, seed=seed, compact=True, algorithm=algorithm)
+    return maze.solve
+
+
+def _analyze(rows, cols, seed, algorithm):
+    maze = Maze(0, 0, rows, cols, 10, 10, seed=seed, compact=True, algorithm=algorithm)
+    return maze.analyze
+
+
+def _analyze_screen(rows, cols, seed, algorithm):
+    # The one-pass metrics used to screen many seeds, without the Euler tour
+    maze = Maze(0, 0, rows, cols, 10, 10, seed=seed, compact=True, algorithm=algorithm)
+    return lambda: maze.analyze(paths=False)
+
+
+def _headless_with_stub(rows, cols, seed, algorithm):
+    # A cell maze built headless, then pointed at a stub window for drawing
+    maze = Maze(0, 0, rows, cols, 10, 10, seed=seed, algorithm=algorithm)
+    win = StubWindow()
+    maze._win = win
+    for row in maze._cells:
+        for cell in row:
+            cell._win = win
+    return maze
+
+
+def _draw(rows, cols, seed, algorithm):
+    maze = _headless_with_stub(rows, cols, seed, algorithm)
+    return maze.draw
+
+
+def _cell_draw(rows, cols, seed, algorithm):
+    maze = _headless_with_stub(rows, cols, seed, algorithm)
+
+    def run():
+        for i, row in enumerate(maze._cells):
+            for j, cell in enumerate(row):
+                cell.draw(*maze._cell_bounds(i, j))
+    return run
+
+
+CASES = {
+    "construct": _construct,
+    "construct_compact": _construct_compact,
+    "break_walls": _break_walls,
+    "solve_recursive": _solve_recursive,
+    "solve_bfs": _solver("bfs"),
+    "solve_dfs": _solver("dfs"),
+    "solve_astar": _solver("astar"),
+    "solve_bidirectional": _solver("bidirectional"),
+    "solve_dead_end": _solver("dead_end"),
+    "analyze": _analyze,
+    "analyze_screen": _analyze_screen,
+    "draw": _draw,
+    "cell_draw": _cell_draw,
+}
+
+
+def measure(case, rows, cols, seed=0, repeat=1, algorithm="dfs"):
+    """Best time over repeat runs and the tracemalloc peak of one more run."""
+    if not fits(case, rows, cols):
+        raise ValueError(f"{case} is limited to {RECURSIVE_MAX_CELLS} cells")
+    build = CASES[case]
+    # Warm up on a 2x2 maze so modules the case imports on first use are
+    # loaded before timing and never charged to whichever case runs first
+    build(2, 2, seed, algorithm)()
+    best = None
+    for _ in range(repeat):
+        run = build(rows, cols, seed, algorithm)
+        began = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+        del run
+
+    run = build(rows, cols, seed, algorithm)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"case": case, "rows": rows, "cols": cols,
+            "seconds": best, "peak_bytes": peak}
+
+
+def fits(case, rows, cols):
+    # Whether case can run on a rows x cols maze
+    return case != "solve_recursive" or rows * cols <= RECURSIVE_MAX_CELLS
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, cases=None, seed=0, repeat=1, log=None,
+                   algorithm="dfs"):
+    """
+    Run every case at every size (square mazes) and return the report dict.
+    Cases are skipped at sizes they cannot run on (see fits).
+    """
+    results = []
+    for size in sizes:
+        for case in cases or CASES:
+            if not fits(case, size, size):
+                continue
+            result = measure(case, size, size, seed, repeat, algorithm)
+            results.append(result)
+            if log is not None:
+                log(_format(result))
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "algorithm": algorithm,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def import_time(module, repeat=5):
+    """
+    Best time to import module in a fresh interpreter, the best wall time of
+    that whole process (interpreter start included), and whether the import
+    pulled in tkinter or Pillow.
+    """
+    code = (
+        "import sys, time; began = time.perf_counter(); import " + module + "; "
+        "print(time.perf_counter() - began, 'tkinter' in sys.modules, 'PIL' in sys.modules)"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = best_process = None
+    loads = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=here,
+                             capture_output=True, text=True)
+        process = time.perf_counter() - began
+        if out.returncode != 0:
+            # e.g. window on a machine without Tk
+            return {"module": module, "error": out.stderr.strip().splitlines()[-1]}
+        seconds, tkinter, pil = out.stdout.split()
+        best = float(seconds) if best is None else min(best, float(seconds))
+        best_process = process if best_process is None else min(best_process, process)
+        loads = {"tkinter": tkinter == "True", "PIL": pil == "True"}
+    return {"module": module, "seconds": best, "process_seconds": best_process,
+            "loads": loads}
+
+
+def compare(old, new):
+    # Lines of new vs old seconds for the (case, rows, cols) both reports have
+    before = {(r["case"], r["rows"], r["cols"]): r for r in old["results"]}
+    lines = []
+    for result in new["results"]:
+        previous = before.get((result["case"], result["rows"], result["cols"]))
+        if previous is None or not result["seconds"]:
+            continue
+        ratio = previous["seconds"] / result["seconds"]
+        lines.append(f"{result['case']:>20} {result['rows']}x{result['cols']}: "
+                     f"{previous['seconds']:.4f}s -> {result['seconds']:.4f}s "
+                     f"({ratio:.2f}x)")
+    before = {r["module"]: r for r in old.get("imports", ())}
+    for result in new.get("imports", ()):
+        previous = before.get(result["module"])
+        if previous is None or not previous.get("seconds") or not result.get("seconds"):
+            continue
+        lines.append(f"{'import ' + result['module']:>20}: "
+                     f"{previous['seconds'] * 1000:.1f}ms -> {result['seconds'] * 1000:.1f}ms "
+                     f"({previous['seconds'] / result['seconds']:.2f}x)")
+    return lines
+
+
+def _format(result):
+    return (f"{result['case']:>20} {result['rows']}x{result['cols']}: "
+            f"{result['seconds']:.4f}s, peak {result['peak_bytes'] / 2**20:.1f} MiB")
+
+
+def _format_import(result):
+    if "error" in result:
+        return f"{'import ' + result['module']:>20}: failed ({result['error']})"
+    loaded = [name for name, present in result["loads"].items() if present]
+    return (f"{'import ' + result['module']:>20}: {result['seconds'] * 1000:.1f}ms, "
+            f"process {result['process_seconds'] * 1000:.1f}ms"
+            + (f", loads {', '.join(loaded)}" if loaded else ""))
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                             text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark maze generation, solving and drawing.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated side lengths of square mazes")
+    parser.add_argument("--cases", default=",".join(CASES),
+                        help=f"comma separated subset of {', '.join(CASES)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--algorithm", default="dfs",
+                        help="generator for the mazes every case works on")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="timed runs per case; the best one is kept")
+    parser.add_argument("--imports", action="store_true",
+                        help=f"also time cold imports of {', '.join(IMPORT_MODULES)}")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in args.cases.split(",") if case]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    report = run_benchmarks(sizes, cases, args.seed, args.repeat,
+                            log=lambda line: print(line, file=sys.stderr),
+                            algorithm=args.algorithm)
+    if args.imports:
+        report["imports"] = []
+        for module in IMPORT_MODULES:
+            result = import_time(module)
+            report["imports"].append(result)
+            print(_format_import(result), file=sys.stderr)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for line in compare(old, report):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
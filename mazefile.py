@@ -0,0 +1,202 @@
+"""
+mazefile.py
+
+Compact binary maze files. A file is a 40 byte header followed by the wall
+bitmask of every cell (row-major, bit layout from grid.py) packed two cells
+per byte: even cells in the low nibble, odd cells in the high nibble.
+
+Header (little-endian):
+    4s  magic b"MAZE"
+    B   format version
+    B   flags (bit 0: a seed is stored; bit 1: built with the Philox rng,
+        see rng.py, rather than random.Random; bits 2-3: the generator
+        inside each tile of a "tiled" maze, as an index in TILE_ALGORITHMS)
+    H   tile side of a "tiled" maze (tiled.py), 0 if not recorded
+    I   num_rows
+    I   num_cols
+    q   seed
+    16s algorithm name, NUL padded
+
+Files can be loaded through mmap, in which case the walls are read straight
+out of the page cache by a NibbleArray and never copied into memory.
+"""
+
+import mmap
+import struct
+from grid import load_numpy
+
+MAGIC = b"MAZE"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHIIq16s")
+_HAS_SEED = 1
+_PHILOX_RNG = 2
+_TILE_ALGORITHM_SHIFT = 2
+# Generators that can fill a tile; their order is fixed by the flag bits
+TILE_ALGORITHMS = ("dfs", "eller", "binary_tree", "sidewinder")
+MAX_TILE = 0xFFFF
+
+# Cells packed per write; even so chunks never split a byte.
+_CHUNK_CELLS = 1 << 20
+
+
+class NibbleArray:
+    """Sequence of 4-bit wall masks stored two per byte in a buffer."""
+
+    def __init__(self, buffer, size, offset=0):
+        self._buffer = buffer
+        self._size = size
+        self._offset = offset
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, k):
+        if not 0 <= k < self._size:
+            raise IndexError("cell index out of range")
+        b = self._buffer[self._offset + (k >> 1)]
+        return b >> 4 if k & 1 else b & 0x0F
+
+    def __setitem__(self, k, value):
+        if not 0 <= k < self._size:
+            raise IndexError("cell index out of range")
+        pos = self._offset + (k >> 1)
+        b = self._buffer[pos]
+        if k & 1:
+            self._buffer[pos] = (b & 0x0F) | ((value & 0x0F) << 4)
+        else:
+            self._buffer[pos] = (b & 0xF0) | (value & 0x0F)
+
+    def __iter__(self):
+        for k in range(self._size):
+            yield self[k]
+
+    def packed(self):
+        # The raw nibble bytes, as stored in the buffer
+        return bytes(self._buffer[self._offset:self._offset + (self._size + 1) // 2])
+
+
+def pack(walls):
+    """Pack one-byte-per-cell wall masks into nibbles."""
+    if len(walls) % 2:
+        walls = bytes(walls) + b"\x00"
+    np = load_numpy()
+    if np is not None:
+        cells = np.frombuffer(walls, dtype=np.uint8)
+        return (cells[0::2] | (cells[1::2] << 4)).tobytes()
+    return bytes(low | (high << 4) for low, high in zip(walls[0::2], walls[1::2]))
+
+
+def unpack(packed, size):
+    """Expand nibble-packed walls into a bytearray of size cells."""
+    np = load_numpy()
+    if np is not None:
+        data = np.frombuffer(packed, dtype=np.uint8)
+        cells = np.empty(len(data) * 2, dtype=np.uint8)
+        cells[0::2] = data & 0x0F
+        cells[1::2] = data >> 4
+        return bytearray(cells[:size].tobytes())
+    walls = bytearray(len(packed) * 2)
+    walls[0::2] = bytes(b & 0x0F for b in packed)
+    walls[1::2] = bytes(b >> 4 for b in packed)
+    del walls[size:]
+    return walls
+
+
+def _header(num_rows, num_cols, seed, algorithm, rng=None, tile=None, tile_algorithm="dfs"):
+    flags = 0
+    if seed is not None:
+        if not isinstance(seed, int) or not -2**63 <= seed < 2**63:
+            raise ValueError("only 64-bit integer seeds can be stored in a maze file")
+        flags |= _HAS_SEED
+    if rng == "philox":
+        flags |= _PHILOX_RNG
+    elif rng is not None:
+        raise ValueError(f"unknown rng {rng!r}, expected None or 'philox'")
+    if tile is not None:
+        if not 0 < tile <= MAX_TILE:
+            raise ValueError(f"only tile sides from 1 to {MAX_TILE} can be stored")
+        if tile_algorithm not in TILE_ALGORITHMS:
+            raise ValueError(f"unknown tile algorithm {tile_algorithm!r}")
+        flags |= TILE_ALGORITHMS.index(tile_algorithm) << _TILE_ALGORITHM_SHIFT
+    name = algorithm.encode("ascii")
+    if len(name) > 16:
+        raise ValueError(f"algorithm name {algorithm!r} is longer than 16 bytes")
+    return HEADER.pack(
+        MAGIC, VERSION, flags, tile or 0, num_rows, num_cols, seed or 0, name
+    )
+
+
+def save(path, walls, num_rows, num_cols, seed=None, algorithm="dfs", rng=None,
+         tile=None, tile_algorithm="dfs"):
+    """
+    Write a maze file for the flat wall buffer walls. A "tiled" maze also
+    records its tile side and the generator used inside each tile.
+    """
+    with open(path, "wb") as f:
+        f.write(_header(num_rows, num_cols, seed, algorithm, rng, tile, tile_algorithm))
+        if isinstance(walls, NibbleArray):
+            f.write(walls.packed())
+            return
+        for start in range(0, len(walls), _CHUNK_CELLS):
+            f.write(pack(walls[start:start + _CHUNK_CELLS]))
+
+
+def save_rows(path, rows, num_rows, num_cols, seed=None, algorithm="eller"):
+    """
+    Write a maze file from an iterable of wall rows (e.g. generators.stream_rows)
+    without ever holding more than one row in memory.
+    """
+    carry = None
+    with open(path, "wb") as f:
+        f.write(_header(num_rows, num_cols, seed, algorithm))
+        for row in rows:
+            # With an odd column count, rows alternate starting on a half byte
+            if carry is not None:
+                row = carry + row
+                carry = None
+            if len(row) % 2:
+                carry = row[-1:]
+                row = row[:-1]
+            f.write(pack(row))
+        if carry is not None:
+            f.write(pack(carry))
+
+
+def read_header(f):
+    data = f.read(HEADER.size)
+    if len(data) != HEADER.size:
+        raise ValueError("not a maze file: truncated header")
+    magic, version, flags, tile, num_rows, num_cols, seed, name = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError("not a maze file: bad magic")
+    if version != VERSION:
+        raise ValueError(f"unsupported maze file version {version}")
+    return {
+        "num_rows": num_rows,
+        "num_cols": num_cols,
+        "seed": seed if flags & _HAS_SEED else None,
+        "algorithm": name.rstrip(b"\0").decode("ascii"),
+        "rng": "philox" if flags & _PHILOX_RNG else None,
+        "tile": tile or None,
+        "tile_algorithm": (TILE_ALGORITHMS[flags >> _TILE_ALGORITHM_SHIFT & 3]
+                           if tile else None),
+    }
+
+
+def load(path, use_mmap=True):
+    """
+    Read a maze file and return (header, walls). With use_mmap the walls are
+    a read-only NibbleArray over the mapped file; otherwise a bytearray.
+    """
+    with open(path, "rb") as f:
+        header = read_header(f)
+        size = header["num_rows"] * header["num_cols"]
+        if use_mmap:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(mapped) < HEADER.size + (size + 1) // 2:
+                raise ValueError("maze file is truncated")
+            return header, NibbleArray(mapped, size, HEADER.size)
+        packed = f.read()
+    if len(packed) < (size + 1) // 2:
+        raise ValueError("maze file is truncated")
+    return header, unpack(packed, size)
@@ -0,0 +1,354 @@
+"""
+offscreen.py
+
+Pure-Pillow stand-ins for Window that render a maze into a palette image
+instead of a Tk canvas, so animations can be recorded without a display.
+Each frame only encodes the rectangle that changed since the previous one,
+and frames are written to the GIF as they are produced rather than being
+collected in memory.
+
+render_animation() goes further for long recordings: it splits an event
+log's frames into chunks, rasterizes and encodes the chunks on a process
+pool, and reassembles them in order into a GIF, APNG or WebP file.
+"""
+
+import math
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, GifImagePlugin
+from events import EventLog, Replayer, move_state, wall_state
+from maze import FrameScheduler
+
+# Palette indices for the colors the maze draws with (Tk names and values).
+COLORS = {
+    "#d9d9d9": (0xD9, 0xD9, 0xD9),  # Tk's default background
+    "black": (0x00, 0x00, 0x00),
+    "red": (0xFF, 0x00, 0x00),
+    "gray": (0xBE, 0xBE, 0xBE),
+}
+PALETTE = {name: index for index, name in enumerate(COLORS)}
+BACKGROUND = PALETTE["#d9d9d9"]
+LINE_WIDTH = 2
+WALL = PALETTE["black"]
+
+# Walls that can meet at a grid corner, by direction out of it: the pixel
+# sampled to see if the wall is there, and the part of the 2x2 corner block
+# it covers. A 2px line is drawn right of and below its end points, so these
+# depend on LINE_WIDTH.
+_CORNER_WALLS = {
+    "up": ((0, -1), (0, 0, 1, 0)),
+    "right": ((2, 0), (0, 0, 1, 1)),
+    "down": ((0, 2), (0, 0, 1, 1)),
+    "left": ((-1, 0), (0, 0, 0, 1)),
+}
+
+
+class OffscreenCanvas:
+    """Palette image with the Window drawing interface and changed-area tracking."""
+
+    def __init__(self, width, height, fps=30):
+        self.fps = fps
+        self._size = (width, height)
+        self._image = Image.new("P", self._size, BACKGROUND)
+        self._image.putpalette([value for rgb in COLORS.values() for value in rgb])
+        self._draw = ImageDraw.Draw(self._image)
+        # Bounding box of pixels changed since the last frame; the first frame is full
+        self._full = (0, 0, width, height)
+        self._dirty = self._full
+
+    def _line(self, x1, y1, x2, y2, fill_color):
+        if fill_color == "#d9d9d9":
+            self._erase_wall(x1, y1, x2, y2)
+        else:
+            self._draw.line((x1, y1, x2, y2), fill=PALETTE[fill_color], width=LINE_WIDTH)
+        if self._dirty is self._full:
+            # Already redrawing everything, e.g. after clear()
+            return
+        pad = LINE_WIDTH
+        self._touch(min(x1, x2) - pad, min(y1, y2) - pad,
+                    max(x1, x2) + pad, max(y1, y2) + pad)
+
+    def _erase_wall(self, x1, y1, x2, y2):
+        # Erase a whole wall, then give back the corner pixels of any walls
+        # still meeting it at either end, so cleared corners leave no stubs
+        x1, x2 = sorted((round(x1), round(x2)))
+        y1, y2 = sorted((round(y1), round(y2)))
+        if y1 == y2:
+            ends = ((x1, y1, "right"), (x2, y2, "left"))
+        else:
+            ends = ((x1, y1, "down"), (x2, y2, "up"))
+        width, height = self._size
+        keep = []
+        for x, y, erased in ends:
+            for direction, ((dx, dy), (left, top, right, bottom)) in _CORNER_WALLS.items():
+                sx, sy = x + dx, y + dy
+                if (direction != erased and 0 <= sx < width and 0 <= sy < height
+                        and self._image.getpixel((sx, sy)) == WALL):
+                    keep.append((x + left, y + top, x + right, y + bottom))
+        self._draw.line((x1, y1, x2, y2), fill=BACKGROUND, width=LINE_WIDTH)
+        for box in keep:
+            self._draw.rectangle(box, fill=WALL)
+
+    def _touch(self, left, top, right, bottom):
+        width, height = self._size
+        box = (max(0, math.floor(left)), max(0, math.floor(top)),
+               min(width, math.ceil(right) + 1), min(height, math.ceil(bottom) + 1))
+        if self._dirty is not None:
+            box = (min(box[0], self._dirty[0]), min(box[1], self._dirty[1]),
+                   max(box[2], self._dirty[2]), max(box[3], self._dirty[3]))
+        self._dirty = box
+
+    def take_delta(self):
+        # (box, cropped image) of everything drawn since the last call, or None
+        if self._dirty is None:
+            return None
+        box = self._dirty
+        self._dirty = None
+        return box, self._image.crop(box)
+
+    # Drawing interface shared with Window
+
+    def draw_line(self, line, fill_color):
+        self._line(line.p1.x, line.p1.y, line.p2.x, line.p2.y, fill_color)
+
+    def draw_segments(self, segments, fill_color):
+        for x1, y1, x2, y2 in segments:
+            self._line(x1, y1, x2, y2, fill_color)
+
+    def draw_wall(self, x1, y1, x2, y2, fill_color):
+        self._line(x1, y1, x2, y2, fill_color)
+
+    def draw_move(self, x1, y1, x2, y2, fill_color):
+        self._line(x1, y1, x2, y2, fill_color)
+
+    def clear(self):
+        self._draw.rectangle((0, 0, *self._size), fill=BACKGROUND)
+        self._dirty = self._full
+
+    def redraw(self):
+        pass
+
+    def wait_frame(self, interval):
+        pass
+
+
+def _gif_header(image):
+    header, _ = GifImagePlugin.getheader(image, info={"loop": 0, "optimize": False})
+    return b"".join(header)
+
+
+def _gif_frame(delta, duration):
+    # Encoded GIF frame for a (box, image) delta; disposal 1 keeps earlier pixels
+    (left, top, _, _), image = delta
+    return b"".join(GifImagePlugin.getdata(
+        image, offset=(left, top), duration=duration, disposal=1
+    ))
+
+
+class GifWindow(OffscreenCanvas):
+    """OffscreenCanvas that appends a delta frame to a GIF file on every frame."""
+
+    def __init__(self, width, height, path, fps=30):
+        super().__init__(width, height, fps)
+        self.frame_count = 0
+        self._duration = round(1000 / fps)
+        self._file = open(path, "wb")
+        self._started = False
+
+    def redraw(self):
+        self._write_frame()
+
+    def wait_frame(self, interval):
+        self._write_frame()
+
+    def close(self):
+        # Flush the last changes and finish the file
+        if self._file.closed:
+            return
+        self._write_frame()
+        self._file.write(b";")
+        self._file.close()
+
+    def _write_frame(self):
+        delta = self.take_delta()
+        if delta is None:
+            return
+        if not self._started:
+            self._file.write(_gif_header(self._image))
+            self._started = True
+        self._file.write(_gif_frame(delta, self._duration))
+        self.frame_count += 1
+
+
+def _render_frames(job):
+    """
+    Worker: rasterize frames [first, last) of a replay. Frame 0 is the walled
+    grid; frame f > 0 adds events [(f - 1) * steps_per_frame, f * steps_per_frame).
+    Returns (GIF header or None, frames) where each frame is encoded GIF bytes,
+    a (box, compressed scanlines) delta for APNG, or None if unchanged.
+    """
+    (data, num_rows, num_cols, geometry, size, steps_per_frame,
+     first, last, fmt, duration) = job
+    events = EventLog.frombytes(num_rows, num_cols, data)
+    canvas = OffscreenCanvas(*size)
+    replayer = Replayer(events, canvas, *geometry)
+
+    # Catch up on everything before this chunk without producing frames. As
+    # in Replayer.replay, the walls are drawn in their state at that point in
+    # one pass (the same pixels as erasing them one by one), then the moves
+    # that still show.
+    start = min(max(first - 1, 0) * steps_per_frame, len(events))
+    replayer.draw_grid(wall_state(events, start))
+    if first > 0:
+        for event in move_state(events, start):
+            replayer.draw_event(*event)
+        canvas.take_delta()
+
+    header = _gif_header(canvas._image) if fmt == "GIF" and first == 0 else None
+    frames = []
+    for frame in range(first, last):
+        if frame > 0:
+            for n in range((frame - 1) * steps_per_frame,
+                           min(frame * steps_per_frame, len(events))):
+                replayer.draw_event(*events[n])
+        delta = canvas.take_delta()
+        if delta is None:
+            frames.append(None)
+        elif fmt == "GIF":
+            frames.append(_gif_frame(delta, duration))
+        else:
+            box, image = delta
+            frames.append((box, _png_scanlines(image)))
+    return header, frames
+
+
+def render_animation(events, path, width, height, x1, y1, cell_size_x, cell_size_y,
+                     fps=30, steps_per_second=None, workers=None, frames_per_chunk=None):
+    """
+    Render an EventLog to an animated GIF, APNG (.png) or WebP file. Frames
+    are rasterized and encoded in chunks across a process pool and
+    reassembled in order; pacing matches Replayer.replay into a GifWindow.
+    Returns the number of frames written.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    fmt = {".gif": "GIF", ".png": "PNG", ".apng": "PNG", ".webp": "WEBP"}.get(ext)
+    if fmt is None:
+        raise ValueError(f"unsupported animation format {ext!r}")
+    if steps_per_second is None:
+        steps_per_second = max(20, events.num_rows * events.num_cols)
+    steps_per_frame = FrameScheduler.steps_per_frame(steps_per_second, fps)
+    total_frames = 1 + math.ceil(len(events) / steps_per_frame)
+    duration = round(1000 / fps)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if frames_per_chunk is None:
+        frames_per_chunk = max(1, math.ceil(total_frames / (workers * 4)))
+    data = events.records.tobytes()
+    geometry = (x1, y1, cell_size_x, cell_size_y)
+    # WebP is encoded from a delta GIF, see _assemble
+    frame_fmt = "PNG" if fmt == "PNG" else "GIF"
+    jobs = [
+        (data, events.num_rows, events.num_cols, geometry, (width, height),
+         steps_per_frame, first, min(first + frames_per_chunk, total_frames),
+         frame_fmt, duration)
+        for first in range(0, total_frames, frames_per_chunk)
+    ]
+
+    if workers <= 1 or len(jobs) == 1:
+        return _assemble(map(_render_frames, jobs), path, fmt, (width, height), duration)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() yields chunks in submission order, so frames stay in sequence
+        return _assemble(pool.map(_render_frames, jobs), path, fmt,
+                         (width, height), duration)
+
+
+def _assemble(chunks, path, fmt, size, duration):
+    # Frames are written as they arrive; none of the formats holds them all
+    if fmt == "PNG":
+        return _write_apng(chunks, path, size, duration)
+    if fmt == "GIF":
+        return _write_gif(chunks, path)
+    # Pillow's WebP encoder takes whole frames from a list or a multi-frame
+    # image. An opened GIF is the latter and decodes one frame per seek, so
+    # the deltas go to a GIF first and are read back frame by frame.
+    tmp = f"{path}.{os.getpid()}.gif"
+    try:
+        count = _write_gif(chunks, tmp)
+        with Image.open(tmp) as gif:
+            # Lossless: the frames are four-colour line art, and lossy
+            # encoding would blur the walls away from the GIF and APNG pixels
+            gif.save(path, format="WEBP", save_all=True, duration=duration, loop=0,
+                     lossless=True)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+def _write_gif(chunks, path):
+    count = 0
+    with open(path, "wb") as f:
+        for header, frames in chunks:
+            if header is not None:
+                f.write(header)
+            for frame in frames:
+                if frame is not None:
+                    f.write(frame)
+                    count += 1
+        f.write(b";")
+    return count
+
+
+def _png_scanlines(image):
+    # zlib stream of a palette image's rows, each with filter type 0 (none)
+    width = image.size[0]
+    pixels = image.tobytes()
+    return zlib.compress(b"".join(
+        b"\0" + pixels[start:start + width] for start in range(0, len(pixels), width)
+    ))
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _write_apng(chunks, path, size, duration):
+    """
+    Write APNG delta frames like the GIF ones: each frame covers only the
+    changed box and is drawn over the previous frame (dispose none, blend
+    source). The frame count in acTL is filled in once all frames are out.
+    """
+    width, height = size
+    palette = bytes(value for rgb in COLORS.values() for value in rgb)
+    count = 0
+    sequence = 0
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)))
+        f.write(_png_chunk(b"PLTE", palette))
+        animation_control = f.tell()
+        f.write(_png_chunk(b"acTL", struct.pack(">II", 0, 0)))
+        for _, frames in chunks:
+            for frame in frames:
+                if frame is None:
+                    continue
+                (left, top, right, bottom), data = frame
+                f.write(_png_chunk(b"fcTL", struct.pack(
+                    ">IIIIIHHBB", sequence, right - left, bottom - top, left, top,
+                    duration, 1000, 0, 0,
+                )))
+                sequence += 1
+                if count == 0:
+                    # The first frame is the whole image and doubles as the still
+                    f.write(_png_chunk(b"IDAT", data))
+                else:
+                    f.write(_png_chunk(b"fdAT", struct.pack(">I", sequence) + data))
+                    sequence += 1
+                count += 1
+        f.write(_png_chunk(b"IEND", b""))
+        f.seek(animation_control)
+        f.write(_png_chunk(b"acTL", struct.pack(">II", count, 0)))
+    return count
@@ -0,0 +1,150 @@
+"""
+pathindex.py
+
+Precomputed distance index for perfect mazes. A perfect maze is a spanning
+tree over its cells, so the path between any two cells runs through their
+lowest common ancestor. One BFS from a root records every cell's parent and
+depth, and a binary lifting table (the 2^level-th ancestor of every cell)
+then finds that ancestor in O(log n) steps:
+
+    distance(a, b) = depth[a] + depth[b] - 2 * depth[lca(a, b)]
+
+Building costs O(n log n) time and memory once; each distance query is
+O(log n) and each path query O(log n + path length).
+"""
+
+from array import array
+from grid import TOP, RIGHT, BOTTOM, LEFT, load_numpy
+
+
+class PathIndex:
+    """
+    Distances and paths between any two cells of a perfect maze. Cells are
+    (i, j) tuples; cells not connected to the root have no distance.
+    """
+
+    def __init__(self, walls, num_rows, num_cols, root=(0, 0)):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        size = num_rows * num_cols
+        root_k = root[0] * num_cols + root[1]
+        parent = array("i", [-1]) * size
+        depth = array("i", [-1]) * size
+        parent[root_k] = root_k
+        depth[root_k] = 0
+
+        last_row = (num_rows - 1) * num_cols
+        last_col = num_cols - 1
+        queue = [root_k]
+        for k in queue:
+            w = walls[k]
+            d = depth[k] + 1
+            p = parent[k]
+            if not w & TOP and k >= num_cols and k - num_cols != p:
+                _visit(parent, depth, queue, k - num_cols, k, d)
+            if not w & RIGHT and k % num_cols != last_col and k + 1 != p:
+                _visit(parent, depth, queue, k + 1, k, d)
+            if not w & BOTTOM and k < last_row and k + num_cols != p:
+                _visit(parent, depth, queue, k + num_cols, k, d)
+            if not w & LEFT and k % num_cols and k - 1 != p:
+                _visit(parent, depth, queue, k - 1, k, d)
+
+        self._depth = depth
+        self._up = _lifting_table(parent, max(depth) if queue else 0)
+
+    def _flat(self, cell):
+        i, j = cell
+        if not (0 <= i < self.num_rows and 0 <= j < self.num_cols):
+            raise IndexError(f"cell {cell!r} is outside the maze")
+        return i * self.num_cols + j
+
+    def _lift(self, k, steps):
+        # Ancestor of k that is `steps` levels above it
+        level = 0
+        while steps:
+            if steps & 1:
+                k = self._up[level][k]
+            steps >>= 1
+            level += 1
+        return k
+
+    def _lca(self, a, b):
+        depth = self._depth
+        if depth[a] < depth[b]:
+            a, b = b, a
+        a = self._lift(a, depth[a] - depth[b])
+        if a == b:
+            return a
+        for up in reversed(self._up):
+            if up[a] != up[b]:
+                a = up[a]
+                b = up[b]
+        return self._up[0][a]
+
+    def depth(self, cell):
+        """Distance from the root, or None if the cell cannot be reached."""
+        d = self._depth[self._flat(cell)]
+        return d if d >= 0 else None
+
+    def reachable(self, a, b):
+        """Whether there is a path between cells a and b."""
+        return self._depth[self._flat(a)] >= 0 and self._depth[self._flat(b)] >= 0
+
+    def distance(self, a, b):
+        """Number of moves between cells a and b, or None if there is no path."""
+        a = self._flat(a)
+        b = self._flat(b)
+        depth = self._depth
+        if depth[a] < 0 or depth[b] < 0:
+            return None
+        return depth[a] + depth[b] - 2 * depth[self._lca(a, b)]
+
+    def path(self, a, b):
+        """Cells [(i, j), ...] from a to b inclusive, or [] if there is no path."""
+        a = self._flat(a)
+        b = self._flat(b)
+        depth = self._depth
+        if depth[a] < 0 or depth[b] < 0:
+            return []
+        top = self._lca(a, b)
+        parent = self._up[0]
+        head = []
+        while a != top:
+            head.append(a)
+            a = parent[a]
+        tail = []
+        while b != top:
+            tail.append(b)
+            b = parent[b]
+        head.append(top)
+        head.extend(reversed(tail))
+        return [divmod(k, self.num_cols) for k in head]
+
+
+def _visit(parent, depth, queue, k, from_k, d):
+    if depth[k] >= 0:
+        raise ValueError("PathIndex needs a perfect maze, found a loop")
+    parent[k] = from_k
+    depth[k] = d
+    queue.append(k)
+
+
+def _lifting_table(parent, max_depth):
+    # up[level][k] is the 2**level-th ancestor of k; the root is its own parent,
+    # so lifting past it stays there. Unreached cells (-1) point at themselves.
+    size = len(parent)
+    parent = array("i", (k if p < 0 else p for k, p in enumerate(parent)))
+    up = [parent]
+    np = load_numpy()
+    if np is not None:
+        current = np.frombuffer(parent, dtype=np.int32)
+        while (1 << len(up)) <= max_depth:
+            current = current[current]
+            level = array("i")
+            level.frombytes(current.tobytes())
+            up.append(level)
+        return up
+    while (1 << len(up)) <= max_depth:
+        prev = up[-1]
+        up.append(array("i", [prev[prev[k]] for k in range(size)]))
+    return up
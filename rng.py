@@ -0,0 +1,91 @@
+"""
+rng.py
+
+Counter-based random streams for maze generation. Each stream is a Philox
+generator keyed by (seed, stream index): output number n of stream s is a
+pure function of (seed, s, n), so any stream can be produced by any worker,
+in any order, and skipped ahead without generating what comes before. A
+maze split into tiles gives every tile its own stream, which keeps the
+result identical whatever the number of workers.
+
+CounterRandom wraps one stream in the subset of the random.Random interface
+the generators use (randrange, random), so it can stand in for the
+Mersenne Twister that Maze uses by default.
+"""
+
+import hashlib
+import random
+from grid import require_numpy
+
+_MASK64 = (1 << 64) - 1
+# Raw 64-bit outputs fetched from the bit generator at a time
+_BLOCK = 1 << 14
+_NEEDS_NUMPY = "counter-based random streams"
+
+
+def seed_key(seed):
+    """64-bit Philox key for a Maze seed; None picks a fresh random key."""
+    if seed is None:
+        return random.SystemRandom().getrandbits(64)
+    if isinstance(seed, int):
+        return seed & _MASK64
+    digest = hashlib.blake2b(str(seed).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def bit_generator(seed, stream=0):
+    """numpy Philox bit generator for stream `stream` of seed."""
+    np = require_numpy(_NEEDS_NUMPY)
+    return np.random.Philox(key=[seed_key(seed), stream & _MASK64])
+
+
+def generator(seed, stream=0):
+    """numpy Generator drawing from stream `stream` of seed."""
+    np = require_numpy(_NEEDS_NUMPY)
+    return np.random.Generator(bit_generator(seed, stream))
+
+
+class CounterRandom:
+    """
+    randrange/random over one Philox stream, buffered so each draw is a
+    list lookup. Every draw consumes exactly one 64-bit output, so seek(n)
+    positions the stream at draw n directly.
+    """
+
+    def __init__(self, seed=None, stream=0):
+        self.key = seed_key(seed)
+        self.stream = stream
+        self._buffer = []
+        self._pos = 0
+        self._drawn = 0     # draws already taken from earlier buffers
+        self.seek(0)
+
+    def seek(self, n):
+        # Philox advances by blocks of four outputs; discard the remainder
+        np = require_numpy(_NEEDS_NUMPY)
+        self._bits = np.random.Philox(key=[self.key, self.stream & _MASK64])
+        self._bits.advance(n // 4)
+        self._bits.random_raw(n % 4)
+        self._buffer = []
+        self._pos = 0
+        self._drawn = n
+
+    def tell(self):
+        return self._drawn + self._pos
+
+    def _next(self):
+        if self._pos == len(self._buffer):
+            self._drawn += len(self._buffer)
+            self._buffer = self._bits.random_raw(_BLOCK).tolist()
+            self._pos = 0
+        value = self._buffer[self._pos]
+        self._pos += 1
+        return value
+
+    def randrange(self, n):
+        # Multiply-shift of the top 32 bits: fast and unbiased enough for n < 2**32
+        return ((self._next() >> 32) * n) >> 32
+
+    def random(self):
+        # 53 random bits, like random.random()
+        return (self._next() >> 11) * (1.0 / (1 << 53))
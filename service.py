@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+service.py
+
+Local maze generation service. A small asyncio HTTP server (TCP or Unix
+socket) that answers
+
+    GET /maze?rows=100&cols=100&seed=7&algorithm=dfs
+
+with the maze in the binary .maze format (see mazefile.py), and
+
+    GET /stats
+
+with JSON counters. Generation runs on a process pool. Identical requests
+that arrive while one is being built share that build. Finished mazes are
+kept in an on-disk cache, so repeat seeds are served straight from disk.
+Requests beyond max_pending are refused with 503 instead of queueing, and
+slow builds time out with 504, so latency stays bounded under load.
+
+Usage:
+    python service.py --port 8765 --cache maze_cache --workers 4
+    python service.py --socket /tmp/maze.sock
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import generators
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def build_maze_file(num_rows, num_cols, seed, algorithm, path):
+    """Worker: generate one maze, write it to path atomically and return its bytes."""
+    from maze import Maze
+
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, compact=True,
+                algorithm=algorithm)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    maze.save(tmp)
+    os.replace(tmp, path)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class MazeService:
+    """
+    Generates, deduplicates and caches mazes. get() is the whole API; the
+    HTTP layer in handle() only parses requests and formats responses.
+    """
+
+    def __init__(self, cache_dir, workers=None, max_pending=64, timeout=30.0,
+                 max_cells=25_000_000):
+        self.cache_dir = cache_dir
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_cells = max_cells
+        self.stats = {"requests": 0, "cache_hits": 0, "deduplicated": 0,
+                      "generated": 0, "rejected": 0, "timeouts": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+        # Spawned, not forked: a forked worker would inherit the sockets of
+        # connections open at that moment and keep them from closing
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self._inflight = {}
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def _path(self, num_rows, num_cols, seed, algorithm):
+        return os.path.join(self.cache_dir, f"{algorithm}_{num_rows}x{num_cols}_{seed}.maze")
+
+    async def get(self, num_rows, num_cols, seed, algorithm="dfs"):
+        """Bytes of the .maze file for these parameters."""
+        if algorithm not in generators.ALGORITHMS:
+            raise ServiceError(400, f"unknown maze algorithm {algorithm!r}")
+        if num_rows < 1 or num_cols < 1 or num_rows * num_cols > self.max_cells:
+            raise ServiceError(400, f"maze size must be between 1 and {self.max_cells} cells")
+        self.stats["requests"] += 1
+
+        path = self._path(num_rows, num_cols, seed, algorithm)
+        if os.path.exists(path):
+            self.stats["cache_hits"] += 1
+            return await asyncio.to_thread(_read, path)
+
+        key = (num_rows, num_cols, seed, algorithm)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            if len(self._inflight) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise ServiceError(503, "too many mazes are being generated, retry later")
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._pool, build_maze_file, num_rows, num_cols, seed, algorithm, path
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["generated"] += 1
+        try:
+            # shield: one waiter timing out must not cancel the shared build
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise ServiceError(504, "maze generation timed out") from None
+
+    async def handle(self, reader, writer):
+        # One request per connection
+        try:
+            status, body, content_type = await self._respond(reader)
+        except ServiceError as e:
+            status, body, content_type = e.status, str(e).encode() + b"\n", "text/plain"
+        except Exception as e:  # a failed build must not take the server down
+            status, body, content_type = 500, f"{e!r}\n".encode(), "text/plain"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("ascii") + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _respond(self, reader):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError):
+            raise ServiceError(400, "malformed request") from None
+        try:
+            method, target, _ = request.split(b"\r\n", 1)[0].decode("ascii").split(" ")
+        except ValueError:
+            raise ServiceError(400, "malformed request line") from None
+        if method != "GET":
+            raise ServiceError(405, "only GET is supported")
+
+        url = urlsplit(target)
+        if url.path == "/stats":
+            return 200, json.dumps(self.stats).encode() + b"\n", "application/json"
+        if url.path != "/maze":
+            raise ServiceError(404, f"no such endpoint {url.path!r}")
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            num_rows = int(query["rows"])
+            num_cols = int(query["cols"])
+            seed = int(query["seed"])
+        except (KeyError, ValueError):
+            raise ServiceError(400, "rows, cols and seed must be integers") from None
+        if not -2**63 <= seed < 2**63:
+            raise ServiceError(400, "seed must fit in 64 bits")
+        body = await self.get(num_rows, num_cols, seed, query.get("algorithm", "dfs"))
+        return 200, body, "application/octet-stream"
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def serve(service, host="127.0.0.1", port=8765, socket_path=None):
+    """Run the service until cancelled, on TCP or (with socket_path) a Unix socket."""
+    if socket_path is not None:
+        server = await asyncio.start_unix_server(service.handle, path=socket_path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve seeded mazes over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--cache", default="maze_cache",
+                        help="directory for cached .maze files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="distinct mazes building at once before requests get 503")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="seconds a request waits for its maze before a 504")
+    args = parser.parse_args(argv)
+
+    service = MazeService(args.cache, args.workers, args.max_pending, args.timeout)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving mazes on {where}")
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
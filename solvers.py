@@ -0,0 +1,477 @@
+"""
+solvers.py
+
+Iterative maze solvers that run directly on a flat wall bytearray (see
+grid.py for the bit layout). Each search records, per cell, the direction
+back to the cell it was reached from, so bookkeeping costs one byte per cell
+and the path is rebuilt by following those pointers from the goal.
+"""
+
+import time
+from array import array
+from collections import OrderedDict
+from grid import TOP, RIGHT, BOTTOM, LEFT, ROOT, require_numpy, wall_array
+
+
+class SolveResult:
+    def __init__(self, strategy, path, nodes_expanded, elapsed):
+        self.strategy = strategy
+        self.path = path                    # [(i, j), ...] from start to goal
+        self.nodes_expanded = nodes_expanded
+        self.elapsed = elapsed              # seconds
+
+    @property
+    def found(self):
+        return bool(self.path)
+
+    def __bool__(self):
+        return self.found
+
+    def __repr__(self):
+        return (
+            f"SolveResult(strategy={self.strategy!r}, length={len(self.path)}, "
+            f"nodes_expanded={self.nodes_expanded}, elapsed={self.elapsed:.6f})"
+        )
+
+
+def trace_path(back, num_cols, goal):
+    # Follow back pointers from goal to the root; returns [(i, j), ...] root first
+    path = []
+    k = goal
+    while True:
+        path.append(divmod(k, num_cols))
+        step = back[k]
+        if step == ROOT:
+            break
+        if step == TOP:
+            k -= num_cols
+        elif step == RIGHT:
+            k += 1
+        elif step == BOTTOM:
+            k += num_cols
+        else:
+            k -= 1
+    path.reverse()
+    return path
+
+
+def bfs(walls, num_rows, num_cols, start, goal):
+    back = bytearray(num_rows * num_cols)
+    back[start] = ROOT
+    last_row = (num_rows - 1) * num_cols
+    last_col = num_cols - 1
+    queue = [start]
+    # Iterating a list while appending to it gives a FIFO without deque overhead
+    for k in queue:
+        if k == goal:
+            return trace_path(back, num_cols, goal), len(queue)
+        w = walls[k]
+        if not w & TOP and k >= num_cols and not back[k - num_cols]:
+            back[k - num_cols] = BOTTOM
+            queue.append(k - num_cols)
+        if not w & RIGHT and k % num_cols != last_col and not back[k + 1]:
+            back[k + 1] = LEFT
+            queue.append(k + 1)
+        if not w & BOTTOM and k < last_row and not back[k + num_cols]:
+            back[k + num_cols] = TOP
+            queue.append(k + num_cols)
+        if not w & LEFT and k % num_cols and not back[k - 1]:
+            back[k - 1] = RIGHT
+            queue.append(k - 1)
+    return [], len(queue)
+
+
+def bfs_tree(walls, num_rows, num_cols, start, goals=None):
+    """
+    Breadth-first search from start that stops once every cell in goals
+    (flat indices; None means the whole maze) has been reached. Returns the
+    back-pointer array, usable with trace_path for any reached cell, and the
+    number of cells expanded.
+    """
+    back = bytearray(num_rows * num_cols)
+    back[start] = ROOT
+    remaining = None if goals is None else set(goals)
+    last_row = (num_rows - 1) * num_cols
+    last_col = num_cols - 1
+    queue = [start]
+    expanded = 0
+    for k in queue:
+        expanded += 1
+        if remaining is not None:
+            remaining.discard(k)
+            if not remaining:
+                break
+        w = walls[k]
+        if not w & TOP and k >= num_cols and not back[k - num_cols]:
+            back[k - num_cols] = BOTTOM
+            queue.append(k - num_cols)
+        if not w & RIGHT and k % num_cols != last_col and not back[k + 1]:
+            back[k + 1] = LEFT
+            queue.append(k + 1)
+        if not w & BOTTOM and k < last_row and not back[k + num_cols]:
+            back[k + num_cols] = TOP
+            queue.append(k + num_cols)
+        if not w & LEFT and k % num_cols and not back[k - 1]:
+            back[k - 1] = RIGHT
+            queue.append(k - 1)
+    return back, expanded
+
+
+def dfs(walls, num_rows, num_cols, start, goal):
+    back = bytearray(num_rows * num_cols)
+    back[start] = ROOT
+    last_row = (num_rows - 1) * num_cols
+    last_col = num_cols - 1
+    stack = [start]
+    expanded = 0
+    while stack:
+        k = stack.pop()
+        expanded += 1
+        if k == goal:
+            return trace_path(back, num_cols, goal), expanded
+        # Push in reverse so up, right, down, left are explored in that order
+        w = walls[k]
+        if not w & LEFT and k % num_cols and not back[k - 1]:
+            back[k - 1] = RIGHT
+            stack.append(k - 1)
+        if not w & BOTTOM and k < last_row and not back[k + num_cols]:
+            back[k + num_cols] = TOP
+            stack.append(k + num_cols)
+        if not w & RIGHT and k % num_cols != last_col and not back[k + 1]:
+            back[k + 1] = LEFT
+            stack.append(k + 1)
+        if not w & TOP and k >= num_cols and not back[k - num_cols]:
+            back[k - num_cols] = BOTTOM
+            stack.append(k - num_cols)
+    return [], expanded
+
+
+def astar(walls, num_rows, num_cols, start, goal):
+    # Manhattan distance is consistent on a 4-connected grid: a step towards
+    # the goal keeps f = g + h the same and a step away raises it by two. So
+    # instead of a heap there are just two buckets, cells at the current f
+    # (taken last in, first out, which goes deep along ties) and cells at
+    # f + 2. Costs are final when a cell is taken; a cell whose cost dropped
+    # after it was queued is taken again, which finds nothing new.
+    size = num_rows * num_cols
+    goal_i, goal_j = divmod(goal, num_cols)
+    above_goal = goal_i * num_cols          # cells before this are above the goal row
+    below_goal = above_goal + num_cols      # cells from this on are below it
+    last_row = (num_rows - 1) * num_cols
+    last_col = num_cols - 1
+    back = bytearray(size)
+    back[start] = ROOT
+    cost = array("i", bytes(4 * size))   # valid where back is set
+    current = [start]
+    expanded = 0
+    while current:
+        later = []
+        take = current.pop
+        same = current.append
+        next_f = later.append
+        while current:
+            k = take()
+            expanded += 1
+            if k == goal:
+                return trace_path(back, num_cols, goal), expanded
+            g = cost[k] + 1
+            w = walls[k]
+            b = back[k]
+            j = k % num_cols
+            # Skip the way back to the parent outright; other cells seen before
+            # (only in mazes with loops) are queued again if now cheaper
+            if (not w & TOP and k >= num_cols and b != TOP
+                    and (not back[k - num_cols] or g < cost[k - num_cols])):
+                cost[k - num_cols] = g
+                back[k - num_cols] = BOTTOM
+                (same if k >= below_goal else next_f)(k - num_cols)
+            if (not w & RIGHT and j != last_col and b != RIGHT
+                    and (not back[k + 1] or g < cost[k + 1])):
+                cost[k + 1] = g
+                back[k + 1] = LEFT
+                (same if j < goal_j else next_f)(k + 1)
+            if (not w & BOTTOM and k < last_row and b != BOTTOM
+                    and (not back[k + num_cols] or g < cost[k + num_cols])):
+                cost[k + num_cols] = g
+                back[k + num_cols] = TOP
+                (same if k < above_goal else next_f)(k + num_cols)
+            if (not w & LEFT and j and b != LEFT
+                    and (not back[k - 1] or g < cost[k - 1])):
+                cost[k - 1] = g
+                back[k - 1] = RIGHT
+                (same if j > goal_j else next_f)(k - 1)
+        current = later
+    return [], expanded
+
+
+def bidirectional(walls, num_rows, num_cols, start, goal):
+    # BFS from both ends at once, always growing the smaller frontier by a
+    # whole level; they meet after exploring far fewer cells than one BFS
+    back_start = bytearray(num_rows * num_cols)
+    back_goal = bytearray(num_rows * num_cols)
+    back_start[start] = ROOT
+    back_goal[goal] = ROOT
+    if start == goal:
+        return [divmod(start, num_cols)], 1
+    last_row = (num_rows - 1) * num_cols
+    last_col = num_cols - 1
+    frontiers = [[start], [goal]]
+    backs = (back_start, back_goal)
+    expanded = 0
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        back = backs[side]
+        other = backs[1 - side]
+        level = []
+        meet = -1
+        for k in frontiers[side]:
+            expanded += 1
+            w = walls[k]
+            if not w & TOP and k >= num_cols and not back[k - num_cols]:
+                back[k - num_cols] = BOTTOM
+                if other[k - num_cols]:
+                    meet = k - num_cols
+                    break
+                level.append(k - num_cols)
+            if not w & RIGHT and k % num_cols != last_col and not back[k + 1]:
+                back[k + 1] = LEFT
+                if other[k + 1]:
+                    meet = k + 1
+                    break
+                level.append(k + 1)
+            if not w & BOTTOM and k < last_row and not back[k + num_cols]:
+                back[k + num_cols] = TOP
+                if other[k + num_cols]:
+                    meet = k + num_cols
+                    break
+                level.append(k + num_cols)
+            if not w & LEFT and k % num_cols and not back[k - 1]:
+                back[k - 1] = RIGHT
+                if other[k - 1]:
+                    meet = k - 1
+                    break
+                level.append(k - 1)
+        if meet >= 0:
+            head = trace_path(back_start, num_cols, meet)
+            tail = trace_path(back_goal, num_cols, meet)
+            tail.reverse()
+            return head + tail[1:], expanded
+        frontiers[side] = level
+    return [], expanded
+
+
+def dead_end_fill(walls, num_rows, num_cols, start, goal):
+    """
+    Dead-end filling, vectorized with numpy: wall off every cell with at most
+    one open neighbour (other than start and goal) until none is left. In a
+    perfect maze only the solution path survives, which is then walked.
+    """
+    np = require_numpy("the 'dead_end' strategy")
+    size = num_rows * num_cols
+    w = wall_array(np, walls, size)
+    k = np.arange(size)
+    j = k % num_cols
+    # (open passages, offset to the neighbour, back pointer from the neighbour)
+    moves = [
+        (((w & TOP) == 0) & (k >= num_cols), -num_cols, BOTTOM),
+        (((w & RIGHT) == 0) & (j < num_cols - 1), 1, LEFT),
+        (((w & BOTTOM) == 0) & (k < size - num_cols), num_cols, TOP),
+        (((w & LEFT) == 0) & (j > 0), -1, RIGHT),
+    ]
+    degree = sum(open_.astype(np.int32) for open_, _, _ in moves)
+
+    alive = np.ones(size, dtype=bool)
+    keep = np.zeros(size, dtype=bool)
+    keep[[start, goal]] = True
+    frontier = np.flatnonzero((degree <= 1) & ~keep)
+    slot = np.empty(size, dtype=np.intp)
+    filled = 0
+    # Each round fills the current dead ends all at once. Rounds get small
+    # as long corridors are eaten one cell per round, so the tail is
+    # finished cell by cell in plain Python.
+    while frontier.size >= _VECTOR_MIN:
+        alive[frontier] = False
+        filled += frontier.size
+        reached = []
+        for open_, offset, _ in moves:
+            nbrs = frontier[open_[frontier]] + offset
+            reached.append(nbrs[alive[nbrs]])
+        reached = np.concatenate(reached)
+        # Deduplicate without sorting: of the entries naming the same cell,
+        # only the one whose position was written last into slot survives
+        index = np.arange(reached.size)
+        slot[reached] = index
+        first = slot[reached] == index
+        unique = reached[first]
+        degree[unique] -= 1
+        # A cell reached from several dead ends at once loses a degree for each
+        rest = reached[~first]
+        while rest.size:
+            index = np.arange(rest.size)
+            slot[rest] = index
+            first = slot[rest] == index
+            degree[rest[first]] -= 1
+            rest = rest[~first]
+        frontier = unique[(degree[unique] <= 1) & ~keep[unique]]
+
+    # Plain Python from here on: bytes index far faster than numpy scalars
+    steps = [(open_.tobytes(), offset, bit) for open_, offset, bit in moves]
+    alive = bytearray(alive.tobytes())
+    if frontier.size:
+        degree = degree.tolist()
+        stack = frontier.tolist()
+        for k in stack:
+            alive[k] = 0
+        while stack:
+            k = stack.pop()
+            filled += 1
+            for open_, offset, _ in steps:
+                next_k = k + offset
+                if open_[k] and alive[next_k]:
+                    degree[next_k] -= 1
+                    if degree[next_k] <= 1 and next_k != start and next_k != goal:
+                        alive[next_k] = 0
+                        stack.append(next_k)
+
+    # Walk what is left; a breadth-first walk also copes with loops
+    back = bytearray(size)
+    back[start] = ROOT
+    queue = [start]
+    for k in queue:
+        if k == goal:
+            return trace_path(back, num_cols, goal), filled + len(queue)
+        for open_, offset, bit in steps:
+            next_k = k + offset
+            if open_[k] and alive[next_k] and not back[next_k]:
+                back[next_k] = bit
+                queue.append(next_k)
+    return [], filled + len(queue)
+
+
+# Rounds of dead-end filling smaller than this are not worth vectorizing
+_VECTOR_MIN = 256
+
+STRATEGIES = {
+    "bfs": bfs,
+    "dfs": dfs,
+    "astar": astar,
+    "bidirectional": bidirectional,
+    "dead_end": dead_end_fill,
+}
+
+
+def solve(walls, num_rows, num_cols, strategy="bfs", start=(0, 0), goal=None):
+    """
+    Find a path from start to goal (default: bottom-right cell) with the
+    named strategy. Returns a SolveResult; it is falsy if there is no path.
+    """
+    try:
+        search = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(
+            f"unknown solve strategy {strategy!r}, expected one of {sorted(STRATEGIES)}"
+        ) from None
+    if goal is None:
+        goal = (num_rows - 1, num_cols - 1)
+    start_k = start[0] * num_cols + start[1]
+    goal_k = goal[0] * num_cols + goal[1]
+
+    began = time.perf_counter()
+    path, expanded = search(walls, num_rows, num_cols, start_k, goal_k)
+    elapsed = time.perf_counter() - began
+    return SolveResult(strategy, path, expanded, elapsed)
+
+
+class SolveCache:
+    """
+    LRU cache of solved paths keyed by (maze key, start, goal). Paths are
+    stored as arrays of flat cell indices; max_bytes bounds their total size
+    and the least recently used entries are evicted first. hits and misses
+    count lookups so the bound can be sized from real traffic.
+    """
+
+    # Rough per-entry cost of the key, the dict slot and the array header
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        cells = self._entries.get(key)
+        if cells is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return cells
+
+    def put(self, key, cells):
+        size = self._size(cells)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= self._size(old)
+        self._entries[key] = cells
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= self._size(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _size(self, cells):
+        return len(cells) * cells.itemsize + self.ENTRY_OVERHEAD
+
+
+def solve_many(walls, num_rows, num_cols, pairs, cache=None, maze_key=None):
+    """
+    Solve every (start, goal) pair, given as (i, j) cells, and return one
+    SolveResult per pair in order. Pairs sharing a start share a single BFS,
+    which runs only until all of that start's goals are reached. With a
+    SolveCache and a maze_key identifying the walls, earlier answers are
+    reused and new ones stored. Raises IndexError for a cell outside the
+    maze, before anything is searched or cached.
+    """
+    pairs = [(tuple(start), tuple(goal)) for start, goal in pairs]
+    for pair in pairs:
+        for i, j in pair:
+            if not (0 <= i < num_rows and 0 <= j < num_cols):
+                raise IndexError(f"cell {(i, j)!r} is outside the maze")
+    results = [None] * len(pairs)
+    by_start = {}
+    for n, (start, goal) in enumerate(pairs):
+        if cache is not None:
+            began = time.perf_counter()
+            cells = cache.get((maze_key, start, goal))
+            if cells is not None:
+                path = [divmod(k, num_cols) for k in cells]
+                results[n] = SolveResult("bfs", path, 0, time.perf_counter() - began)
+                continue
+        by_start.setdefault(start, []).append(n)
+
+    for start, indices in by_start.items():
+        began = time.perf_counter()
+        goals = {pairs[n][1][0] * num_cols + pairs[n][1][1] for n in indices}
+        back, expanded = bfs_tree(
+            walls, num_rows, num_cols, start[0] * num_cols + start[1], goals
+        )
+        elapsed = time.perf_counter() - began
+        for n in indices:
+            goal = pairs[n][1]
+            goal_k = goal[0] * num_cols + goal[1]
+            path = trace_path(back, num_cols, goal_k) if back[goal_k] else []
+            results[n] = SolveResult("bfs", path, expanded, elapsed)
+            if cache is not None:
+                cache.put((maze_key, start, goal),
+                          array("I", (i * num_cols + j for i, j in path)))
+    return results
@@ -0,0 +1,99 @@
+"""
+stats.py
+
+Opt-in instrumentation for Maze and Window. A MazeStats object counts the
+work done (cells visited, walls broken, solver backtracks, draw calls and
+Tk updates) and times named phases; it can also run cProfile during those
+phases and export a Chrome trace (chrome://tracing, Perfetto) of them.
+
+Instrumented code holds either a MazeStats or None, so when instrumentation
+is off the only cost is a None check or an empty context manager.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+_NO_PHASE = nullcontext()
+
+
+def phase(stats, name):
+    # stats.phase(name), or a shared do-nothing context manager without stats
+    if stats is None:
+        return _NO_PHASE
+    return stats.phase(name)
+
+
+class MazeStats:
+    """
+    Counters and per-phase timers. Timers are cumulative wall-clock seconds
+    and nest: time spent in "wait" inside "generate" counts towards both.
+    """
+
+    COUNTERS = ("cells_visited", "walls_broken", "backtracks", "draw_calls", "tk_updates")
+
+    def __init__(self, profile=False):
+        self.cells_visited = 0
+        self.walls_broken = 0
+        self.backtracks = 0
+        self.draw_calls = 0
+        self.tk_updates = 0
+        self.timers = {}
+        self.spans = []     # (phase, start, duration) in seconds since creation
+        self._origin = time.perf_counter()
+        self._profiler = None
+        if profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+        self._depth = 0
+
+    @contextmanager
+    def phase(self, name):
+        if self._profiler is not None and self._depth == 0:
+            self._profiler.enable()
+        self._depth += 1
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - began
+            self._depth -= 1
+            if self._profiler is not None and self._depth == 0:
+                self._profiler.disable()
+            self.timers[name] = self.timers.get(name, 0.0) + elapsed
+            self.spans.append((name, began - self._origin, elapsed))
+
+    def as_dict(self):
+        counters = {name: getattr(self, name) for name in self.COUNTERS}
+        return {"counters": counters, "timers": dict(self.timers)}
+
+    def __repr__(self):
+        counters = ", ".join(f"{name}={getattr(self, name)}" for name in self.COUNTERS)
+        timers = ", ".join(f"{name}={seconds:.6f}s" for name, seconds in self.timers.items())
+        return f"MazeStats({counters}; {timers})"
+
+    def write_profile(self, path):
+        """Write the cProfile data collected during phases (for pstats, snakeviz)."""
+        if self._profiler is None:
+            raise ValueError("profiling was not enabled; use MazeStats(profile=True)")
+        self._profiler.dump_stats(path)
+
+    def write_chrome_trace(self, path):
+        """Write phases as complete events and final counter values as one counter event."""
+        import json
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = [
+            {"name": name, "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+             "pid": pid, "tid": tid}
+            for name, start, duration in self.spans
+        ]
+        end = max((start + duration for _, start, duration in self.spans), default=0.0)
+        events.append({
+            "name": "counters", "ph": "C", "ts": end * 1e6, "pid": pid, "tid": tid,
+            "args": {name: getattr(self, name) for name in self.COUNTERS},
+        })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -1,5 +1,146 @@
 import unittest
-from window import Maze
+from window import Maze, Window, Viewport, view_segments, lod_image
+import io
+import os
+import random
+import tempfile
+import tracemalloc
+from grid import CompactGrid, TOP, RIGHT, BOTTOM, LEFT
+from batch import generate_batch
+import generators
+import mazefile
+import events
+import solvers
+from pathindex import PathIndex
+import maze_bench
+import asyncio
+import service
+import rng
+import tiled
+import window
+import analysis
+from unittest import mock
+from stats import MazeStats
+import json
+import pstats
+
+try:
+    from PIL import Image
+    from offscreen import GifWindow, OffscreenCanvas, render_animation
+except ImportError:  # Pillow is only needed for GIF output
+    GifWindow = OffscreenCanvas = render_animation = None
+
+def count_reachable(walls, num_rows, num_cols):
+    # Flood fill from the top-left cell through open walls
+    seen = {0}
+    stack = [0]
+    while stack:
+        k = stack.pop()
+        i, j = divmod(k, num_cols)
+        for bit, ni, nj in ((TOP, i - 1, j), (RIGHT, i, j + 1),
+                            (BOTTOM, i + 1, j), (LEFT, i, j - 1)):
+            nk = ni * num_cols + nj
+            if (not walls[k] & bit and 0 <= ni < num_rows
+                    and 0 <= nj < num_cols and nk not in seen):
+                seen.add(nk)
+                stack.append(nk)
+    return len(seen)
+
+
+def count_openings(walls, num_rows, num_cols):
+    # Interior passages, counting each shared wall once
+    openings = 0
+    for k in range(num_rows * num_cols):
+        if not walls[k] & RIGHT and (k + 1) % num_cols:
+            openings += 1
+        if not walls[k] & BOTTOM and k < (num_rows - 1) * num_cols:
+            openings += 1
+    return openings
+
+
+class StubWindow:
+    # Stand-in for Window that records drawing calls instead of using Tk
+    def __init__(self):
+        self.lines = []
+        self.segments = []
+        self.redraws = 0
+        self.frames = []
+        self.fps = 60
+
+    def draw_line(self, line, fill_color):
+        self.lines.append((line.p1.x, line.p1.y, line.p2.x, line.p2.y, fill_color))
+
+    def draw_wall(self, x1, y1, x2, y2, fill_color):
+        self.lines.append((x1, y1, x2, y2, fill_color))
+
+    def draw_move(self, x1, y1, x2, y2, fill_color):
+        self.lines.append((x1, y1, x2, y2, fill_color))
+
+    def draw_segments(self, segments, fill_color):
+        self.segments.extend((*segment, fill_color) for segment in segments)
+
+    def clear(self):
+        self.lines = []
+        self.segments = []
+
+    def redraw(self):
+        self.redraws += 1
+
+    def wait_frame(self, interval):
+        self.frames.append(interval)
+
+
+class FakeRoot:
+    def update(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def after(self, delay_ms, func, *args):
+        func(*args)
+
+    def wait_variable(self, var):
+        pass
+
+
+class FakeVar:
+    def set(self, value):
+        pass
+
+
+class FakeCanvas:
+    # Minimal Tk canvas double: tracks live items and their fill colors
+    def __init__(self):
+        self.items = {}
+        self.created = 0
+
+    def create_line(self, *coords, fill=None, width=None):
+        self.created += 1
+        self.items[self.created] = fill
+        return self.created
+
+    def itemconfig(self, item, fill=None):
+        self.items[item] = fill
+
+    def delete(self, tag):
+        self.items.clear()
+
+
+def headless_window():
+    # A real Window whose Tk root and canvas are replaced by doubles
+    win = Window.__new__(Window)
+    win._Window__root = FakeRoot()
+    win._Window__canvas = FakeCanvas()
+    win._Window__wall_ids = {}
+    win._Window__move_ids = {}
+    win._Window__frame_due = FakeVar()
+    win._Window__next_frame = 0.0
+    win._Window__closed = False
+    win.fps = 60
+    win.stats = None
+    return win
+
 
 class Tests(unittest.TestCase):
     def test_maze_create_cells_basic(self):
@@ -179,5 +320,956 @@ class Tests(unittest.TestCase):
             # Reset for next iteration
             m._reset_cells_visited()
 
+    def test_compact_maze_matches_cell_maze(self):
+        # Compact storage should produce the same layout for the same seed
+        m1 = Maze(0, 0, 6, 7, 10, 10, seed=3)
+        m2 = Maze(0, 0, 6, 7, 10, 10, seed=3, compact=True)
+        self.assertIsInstance(m2._cells, CompactGrid)
+        self.assertEqual(len(m2._cells), 6)
+        self.assertEqual(len(m2._cells[0]), 7)
+        for i in range(6):
+            for j in range(7):
+                c1 = m1._cells[i][j]
+                c2 = m2._cells[i][j]
+                self.assertEqual(
+                    (c1.has_top_wall, c1.has_right_wall,
+                     c1.has_bottom_wall, c1.has_left_wall),
+                    (c2.has_top_wall, c2.has_right_wall,
+                     c2.has_bottom_wall, c2.has_left_wall),
+                    f"Cell [{i}][{j}] wall mismatch"
+                )
+        self.assertTrue(m2.solve(), "Compact maze should be solvable")
+        self.assertTrue(m2._cells[5][6].visited)
+
+    def test_compact_grid_visited_bitset(self):
+        grid = CompactGrid(3, 5)
+        grid[2][4].visited = True
+        grid[0][1].visited = True
+        self.assertTrue(grid.is_visited(14))
+        self.assertTrue(grid[0][1].visited)
+        self.assertFalse(grid[1][1].visited)
+        grid[0][1].visited = False
+        self.assertFalse(grid[0][1].visited)
+        grid.reset_visited()
+        self.assertFalse(grid[2][4].visited)
+        # 15 wall bytes plus two bytes of visited bits
+        self.assertEqual(grid.nbytes(), 17)
+
+    def test_compact_rejects_window(self):
+        with self.assertRaises(ValueError):
+            Maze(0, 0, 2, 2, 10, 10, win=object(), compact=True)
+
+    def test_maze_seeded_layout_is_stable(self):
+        # Layout produced by the original recursive generator for seed 7
+        expected = [
+            [10, 13, 5, 1, 3],
+            [12, 5, 3, 10, 10],
+            [9, 3, 12, 6, 10],
+            [14, 12, 5, 5, 2],
+        ]
+        m = Maze(0, 0, 4, 5, 10, 10, seed=7)
+        for i in range(4):
+            for j in range(5):
+                cell = m._cells[i][j]
+                walls = ((TOP if cell.has_top_wall else 0)
+                         | (RIGHT if cell.has_right_wall else 0)
+                         | (BOTTOM if cell.has_bottom_wall else 0)
+                         | (LEFT if cell.has_left_wall else 0))
+                self.assertEqual(walls, expected[i][j], f"Cell [{i}][{j}] walls")
+
+    def test_maze_generation_deep_dfs(self):
+        # Far beyond the old recursion limit; the carved maze must be a spanning tree
+        num_rows = 300
+        num_cols = 300
+        m = Maze(0, 0, num_rows, num_cols, 10, 10, seed=1, compact=True)
+        openings = count_openings(m._cells.walls, num_rows, num_cols)
+        self.assertEqual(openings, num_rows * num_cols - 1)
+
+    def test_maze_solve_strategies(self):
+        m = Maze(0, 0, 8, 9, 10, 10, seed=5)
+        results = {s: m.solve(strategy=s) for s in solvers.STRATEGIES}
+        # A perfect maze has a single path, so every strategy finds the same one
+        path = results["bfs"].path
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (7, 8))
+        for strategy, result in results.items():
+            self.assertTrue(result, f"{strategy} should find a path")
+            self.assertEqual(result.path, path, f"{strategy} path mismatch")
+            self.assertGreaterEqual(result.nodes_expanded, len(path))
+            self.assertGreaterEqual(result.elapsed, 0)
+        # Consecutive cells must be joined by an open wall
+        for (i, j), (ni, nj) in zip(path, path[1:]):
+            cell = m._cells[i][j]
+            if ni < i:
+                self.assertFalse(cell.has_top_wall)
+            elif ni > i:
+                self.assertFalse(cell.has_bottom_wall)
+            elif nj > j:
+                self.assertFalse(cell.has_right_wall)
+            else:
+                self.assertFalse(cell.has_left_wall)
+
+    def test_astar_finds_shortest_paths_through_loops(self):
+        # Knock extra walls out of a perfect maze so many routes exist
+        rng = random.Random(3)
+        rows, cols = 30, 35
+        walls = bytearray(Maze(0, 0, rows, cols, 10, 10, seed=3, compact=True)._cells.walls)
+        grid = CompactGrid(rows, cols, walls)
+        for _ in range(400):
+            k = rng.randrange(rows * cols)
+            if k % cols < cols - 1:
+                grid.set_wall(k, RIGHT, False)
+                grid.set_wall(k + 1, LEFT, False)
+            if k < (rows - 1) * cols:
+                grid.set_wall(k, BOTTOM, False)
+                grid.set_wall(k + cols, TOP, False)
+        for _ in range(30):
+            start, goal = rng.randrange(rows * cols), rng.randrange(rows * cols)
+            shortest, _ = solvers.bfs(walls, rows, cols, start, goal)
+            path, _ = solvers.astar(walls, rows, cols, start, goal)
+            self.assertEqual(len(path), len(shortest))
+            self.assertEqual(path[0], divmod(start, cols))
+            self.assertEqual(path[-1], divmod(goal, cols))
+
+    def test_maze_solve_strategy_large_compact(self):
+        m = Maze(0, 0, 200, 200, 10, 10, seed=2, compact=True)
+        result = m.solve(strategy="bfs")
+        self.assertEqual(result.path[-1], (199, 199))
+
+    def test_fast_solvers_match_bfs(self):
+        for algorithm in ("dfs", "sidewinder", "eller"):
+            m = Maze(0, 0, 120, 150, 10, 10, seed=4, compact=True, algorithm=algorithm)
+            walls = m._wall_buffer()
+            expected = m.solve(strategy="bfs").path
+            for strategy in ("bidirectional", "dead_end"):
+                self.assertEqual(m.solve(strategy=strategy).path, expected,
+                                 f"{strategy} on a {algorithm} maze")
+            start, goal = (60, 10), (3, 140)
+            expected = solvers.solve(walls, 120, 150, start=start, goal=goal).path
+            for strategy in ("bidirectional", "dead_end"):
+                result = solvers.solve(walls, 120, 150, strategy, start, goal)
+                self.assertEqual(result.path, expected)
+
+    def test_fast_solvers_on_loops_and_walled_off_goals(self):
+        # 3x3 with every interior wall open: many shortest paths, all length 5
+        open_grid = CompactGrid(3, 3)
+        for k in range(9):
+            i, j = divmod(k, 3)
+            for bit, ok in ((TOP, i > 0), (RIGHT, j < 2), (BOTTOM, i < 2), (LEFT, j > 0)):
+                if ok:
+                    open_grid.set_wall(k, bit, False)
+        walled = bytearray([15]) * 9
+        for strategy in ("bidirectional", "dead_end"):
+            result = solvers.solve(open_grid.walls, 3, 3, strategy)
+            self.assertEqual(len(result.path), 5)
+            self.assertEqual((result.path[0], result.path[-1]), ((0, 0), (2, 2)))
+            self.assertFalse(solvers.solve(walled, 3, 3, strategy))
+            same = solvers.solve(walled, 3, 3, strategy, (1, 1), (1, 1))
+            self.assertEqual(same.path, [(1, 1)])
+
+    def test_maze_solve_unknown_strategy(self):
+        m = Maze(0, 0, 2, 2, 10, 10)
+        with self.assertRaises(ValueError):
+            m.solve(strategy="teleport")
+
+    def test_maze_does_not_touch_global_random(self):
+        random.seed(123)
+        expected = random.random()
+        random.seed(123)
+        Maze(0, 0, 5, 5, 10, 10, seed=9)
+        self.assertEqual(random.random(), expected)
+
+    def test_generate_batch_matches_single_mazes(self):
+        seeds = [0, 1, 2, 3, 4]
+        serial = generate_batch(seeds, 6, 8, workers=1)
+        pooled = generate_batch(seeds, 6, 8, workers=2)
+        self.assertEqual(serial, pooled)
+        for seed, data in zip(seeds, pooled):
+            m = Maze(0, 0, 6, 8, 10, 10, seed=seed, compact=True)
+            self.assertEqual(data, bytes(m._cells.walls))
+        grid = CompactGrid(6, 8, bytearray(pooled[0]))
+        self.assertFalse(grid[0][0].has_top_wall)
+
+    def test_generators_produce_perfect_mazes(self):
+        for algorithm in ("dfs", "binary_tree", "sidewinder", "eller"):
+            for num_rows, num_cols in ((1, 1), (1, 7), (6, 1), (9, 13), (300, 4)):
+                walls = generators.generate(algorithm, num_rows, num_cols, seed=4)
+                size = num_rows * num_cols
+                self.assertEqual(len(walls), size)
+                self.assertEqual(count_openings(walls, num_rows, num_cols), size - 1,
+                                 f"{algorithm} {num_rows}x{num_cols} openings")
+                self.assertEqual(count_reachable(walls, num_rows, num_cols), size,
+                                 f"{algorithm} {num_rows}x{num_cols} connectivity")
+                # Wall state must agree on both sides of every shared wall
+                for k in range(size):
+                    if (k + 1) % num_cols:
+                        self.assertEqual(bool(walls[k] & RIGHT), bool(walls[k + 1] & LEFT))
+                    if k + num_cols < size:
+                        self.assertEqual(bool(walls[k] & BOTTOM),
+                                         bool(walls[k + num_cols] & TOP))
+
+    def test_maze_algorithm_parameter(self):
+        for algorithm in ("binary_tree", "sidewinder", "eller"):
+            m1 = Maze(0, 0, 7, 8, 10, 10, seed=11, algorithm=algorithm)
+            m2 = Maze(0, 0, 7, 8, 10, 10, seed=11, algorithm=algorithm, compact=True)
+            self.assertEqual(m1._wall_buffer(), m2._wall_buffer())
+            self.assertFalse(m2._cells[0][0].has_top_wall)
+            self.assertFalse(m2._cells[6][7].has_bottom_wall)
+            self.assertTrue(m1.solve(), f"{algorithm} maze should be solvable")
+            self.assertTrue(m2.solve(strategy="bfs"))
+        with self.assertRaises(ValueError):
+            Maze(0, 0, 2, 2, 10, 10, algorithm="kruskal")
+
+    def test_stream_rows_match_maze(self):
+        out = io.BytesIO()
+        written = generators.write_stream(out, 9, 11, seed=6)
+        self.assertEqual(written, 99)
+        m = Maze(0, 0, 9, 11, 10, 10, seed=6, algorithm="eller", compact=True)
+        self.assertEqual(out.getvalue(), bytes(m._cells.walls))
+
+    def test_stream_rows_memory_is_per_row(self):
+        class Sink:
+            def write(self, data):
+                pass
+
+        num_rows = 400
+        num_cols = 200
+        tracemalloc.start()
+        try:
+            generators.write_stream(Sink(), num_rows, num_cols, seed=1)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, num_rows * num_cols // 2)
+
+    def test_maze_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "m.maze")
+            m = Maze(0, 0, 7, 9, 10, 10, seed=8)
+            m.save(path)
+            # 40 byte header plus two cells per byte
+            self.assertEqual(os.path.getsize(path), mazefile.HEADER.size + 32)
+            for use_mmap in (True, False):
+                loaded = Maze.load(path, use_mmap=use_mmap)
+                self.assertEqual(loaded._seed, 8)
+                self.assertEqual(loaded._algorithm, "dfs")
+                self.assertEqual(list(loaded._cells.walls), list(m._wall_buffer()))
+                self.assertEqual(
+                    loaded.solve(strategy="bfs").path, m.solve(strategy="bfs").path
+                )
+            mapped = Maze.load(path)
+            self.assertIsInstance(mapped._cells.walls, mazefile.NibbleArray)
+            self.assertTrue(mapped.solve())
+            # Re-saving a mapped maze writes the same bytes
+            copy = os.path.join(tmp, "copy.maze")
+            mapped.save(copy)
+            with open(path, "rb") as a, open(copy, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_mazefile_streamed_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "s.maze")
+            mazefile.save_rows(path, generators.stream_rows(5, 7, seed=2), 5, 7, seed=2)
+            loaded = Maze.load(path, use_mmap=False)
+            m = Maze(0, 0, 5, 7, 10, 10, seed=2, algorithm="eller", compact=True)
+            self.assertEqual(loaded._cells.walls, m._cells.walls)
+            self.assertEqual(loaded._algorithm, "eller")
+
+    def test_mazefile_rejects_bad_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bad.maze")
+            with open(path, "wb") as f:
+                f.write(b"NOPE" + bytes(60))
+            with self.assertRaises(ValueError):
+                Maze.load(path)
+
+    def test_batched_draw_merges_walls(self):
+        win = StubWindow()
+        m = Maze(0, 0, 3, 4, 10, 10, win=win, seed=1)
+        m.draw()
+        self.assertEqual(win.lines, [], "Full draw should not go through draw_line")
+        # Every wall is covered exactly once by the merged segments
+        drawn = set()
+        for x1, y1, x2, y2, color in win.segments:
+            self.assertEqual(color, "black")
+            self.assertTrue(x1 == x2 or y1 == y2)
+            if y1 == y2:
+                for x in range(x1, x2, 10):
+                    wall = ("h", x, y1)
+                    self.assertNotIn(wall, drawn)
+                    drawn.add(wall)
+            else:
+                for y in range(y1, y2, 10):
+                    wall = ("v", x1, y)
+                    self.assertNotIn(wall, drawn)
+                    drawn.add(wall)
+        expected = set()
+        for i in range(3):
+            for j in range(4):
+                cell = m._cells[i][j]
+                if cell.has_top_wall:
+                    expected.add(("h", j * 10, i * 10))
+                if cell.has_bottom_wall:
+                    expected.add(("h", j * 10, i * 10 + 10))
+                if cell.has_left_wall:
+                    expected.add(("v", j * 10, i * 10))
+                if cell.has_right_wall:
+                    expected.add(("v", j * 10 + 10, i * 10))
+        self.assertEqual(drawn, expected)
+
+    def test_initial_grid_is_drawn_as_long_lines(self):
+        win = StubWindow()
+        Maze(5, 5, 4, 6, 10, 10, win=win, seed=1)
+        # One line per grid line before carving: 5 horizontal and 7 vertical
+        self.assertEqual(len(win.segments), 12)
+        # Per-step updates are grouped into scheduled frames, not forced redraws
+        self.assertEqual(win.redraws, 1)
+        self.assertGreater(len(win.frames), 0)
+
+    def test_window_reuses_canvas_items(self):
+        win = headless_window()
+        canvas = win._Window__canvas
+        m = Maze(0, 0, 12, 12, 10, 10, win=win, seed=3, animation_duration=0.01)
+        m.solve()
+        m.solve()
+        # Walls and moves are keyed by position, so repeated draws never stack
+        cells = 12 * 12
+        walls = 2 * cells + 12 + 12
+        self.assertLessEqual(len(win._Window__wall_ids), walls)
+        self.assertLessEqual(len(win._Window__move_ids), 2 * (cells - 1))
+        grid_lines = 13 + 13
+        self.assertEqual(
+            canvas.created,
+            grid_lines + len(win._Window__wall_ids) + len(win._Window__move_ids)
+        )
+
+    def test_window_recolors_undone_moves(self):
+        win = headless_window()
+        canvas = win._Window__canvas
+        win.draw_move(5, 5, 15, 5, "red")
+        win.draw_move(5, 5, 15, 5, "gray")
+        win.draw_wall(0, 0, 10, 0, "black")
+        win.draw_wall(0, 0, 10, 0, "#d9d9d9")
+        self.assertEqual(canvas.created, 2)
+        self.assertEqual(sorted(canvas.items.values()), ["#d9d9d9", "gray"])
+        win.clear()
+        self.assertEqual(canvas.items, {})
+        win.draw_wall(0, 0, 10, 0, "black")
+        self.assertEqual(canvas.created, 3)
+
+    def test_animation_duration_bounds_run_time(self):
+        win = StubWindow()
+        m = Maze(0, 0, 100, 100, 5, 5, win=win, seed=1, animation_duration=10)
+        m.solve()
+        # Frames are paced to add up to about the requested duration
+        self.assertLessEqual(sum(win.frames), 10.5)
+        self.assertLessEqual(len(win.frames), 10 * win.fps + 10)
+
+    def test_default_animation_pace(self):
+        # Without a duration, small mazes keep the old 20 steps per second
+        win = StubWindow()
+        Maze(0, 0, 2, 2, 10, 10, win=win, seed=1)
+        self.assertTrue(win.frames)
+        for interval in win.frames:
+            self.assertAlmostEqual(interval, 0.05)
+
+    @unittest.skipIf(GifWindow is None, "Pillow is not installed")
+    def test_gif_window_streams_delta_frames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "maze.gif")
+            win = GifWindow(200, 200, path)
+            m = Maze(20, 20, 5, 5, 32, 32, win=win, seed=4)
+            m.solve()
+            final = win._image.convert("RGB")
+            win.close()
+            with Image.open(path) as gif:
+                self.assertEqual(gif.n_frames, win.frame_count)
+                self.assertEqual(gif.size, (200, 200))
+                # Later frames only cover the region that changed
+                gif.seek(1)
+                self.assertLess(gif.tile[0][1][2] - gif.tile[0][1][0], 200)
+                gif.seek(gif.n_frames - 1)
+                self.assertEqual(gif.convert("RGB").tobytes(), final.tobytes())
+
+    @unittest.skipIf(GifWindow is None, "Pillow is not installed")
+    def test_erased_walls_leave_no_stubs(self):
+        # Carving wall by wall ends on the same pixels as drawing the finished maze
+        for cell_size in (25, 3):
+            m = Maze(5, 5, 10, 10, cell_size, cell_size, seed=5, record=True, compact=True)
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "maze.gif")
+                render_animation(m.events, path, 300, 300, 5, 5, cell_size, cell_size)
+                with Image.open(path) as gif:
+                    gif.seek(gif.n_frames - 1)
+                    final = gif.convert("RGB").tobytes()
+            clean = OffscreenCanvas(300, 300)
+            events.Replayer(m.events, clean, 5, 5, cell_size, cell_size).draw_grid(
+                m._wall_buffer())
+            self.assertEqual(final, clean._image.convert("RGB").tobytes())
+
+    @unittest.skipIf(GifWindow is None, "Pillow is not installed")
+    def test_parallel_render_matches_sequential(self):
+        m = Maze(20, 20, 6, 6, 25, 25, seed=5, record=True)
+        m.solve()
+        with tempfile.TemporaryDirectory() as tmp:
+            sequential = os.path.join(tmp, "sequential.gif")
+            win = GifWindow(200, 200, sequential)
+            events.Replayer(m.events, win, 20, 20, 25, 25).replay(steps_per_second=120)
+            win.close()
+            outputs = []
+            for workers in (1, 3):
+                path = os.path.join(tmp, f"parallel{workers}.gif")
+                count = render_animation(m.events, path, 200, 200, 20, 20, 25, 25,
+                                         steps_per_second=120, workers=workers,
+                                         frames_per_chunk=7)
+                self.assertEqual(count, win.frame_count)
+                with open(path, "rb") as f:
+                    outputs.append(f.read())
+            # Chunks are reassembled in order whatever the pool size
+            self.assertEqual(outputs[0], outputs[1])
+            # Chunks that start from the wall and move state show the same
+            # frames as one continuous replay
+            with Image.open(sequential) as a, Image.open(path) as b:
+                self.assertEqual(a.n_frames, b.n_frames)
+                for frame in range(a.n_frames):
+                    a.seek(frame)
+                    b.seek(frame)
+                    self.assertEqual(a.convert("RGB").tobytes(),
+                                     b.convert("RGB").tobytes(), frame)
+
+            # APNG gets the same delta frames and the same final image
+            apng = os.path.join(tmp, "maze.png")
+            count = render_animation(m.events, apng, 200, 200, 20, 20, 25, 25,
+                                     steps_per_second=120, workers=2)
+            with Image.open(apng) as a, Image.open(path) as b:
+                self.assertEqual(a.n_frames, count)
+                a.seek(1)
+                self.assertLess(a.tile[0][1][2] - a.tile[0][1][0], 200)
+                a.seek(a.n_frames - 1)
+                b.seek(b.n_frames - 1)
+                self.assertEqual(a.convert("RGB").tobytes(), b.convert("RGB").tobytes())
+            webp = os.path.join(tmp, "maze.webp")
+            count = render_animation(m.events, webp, 200, 200, 20, 20, 25, 25,
+                                     steps_per_second=120, workers=2)
+            with Image.open(webp) as w, Image.open(path) as b:
+                self.assertEqual(w.n_frames, count)
+                self.assertEqual(w.size, (200, 200))
+                w.seek(w.n_frames - 1)
+                b.seek(b.n_frames - 1)
+                self.assertEqual(w.convert("RGB").tobytes(), b.convert("RGB").tobytes())
+            self.assertEqual(sorted(os.listdir(tmp)), sorted(
+                ["sequential.gif", "parallel1.gif", "parallel3.gif", "maze.png", "maze.webp"]
+            ))
+            with self.assertRaises(ValueError):
+                render_animation(m.events, os.path.join(tmp, "maze.bmp"),
+                                 200, 200, 20, 20, 25, 25)
+
+    def test_path_index_matches_bfs(self):
+        m = Maze(0, 0, 30, 20, 10, 10, seed=7, compact=True)
+        walls = m._wall_buffer()
+        rng = random.Random(1)
+        for _ in range(50):
+            a = (rng.randrange(30), rng.randrange(20))
+            b = (rng.randrange(30), rng.randrange(20))
+            expected = solvers.solve(walls, 30, 20, start=a, goal=b).path
+            self.assertEqual(m.path(a, b), expected)
+            self.assertEqual(m.distance(a, b), len(expected) - 1)
+        self.assertEqual(m.distance((0, 0), (0, 0)), 0)
+        self.assertEqual(m.path((0, 0), (29, 19)), m.solve(strategy="bfs").path)
+        # The index is built once and kept on the maze
+        self.assertIs(m.path_index(), m.path_index())
+        with self.assertRaises(IndexError):
+            m.distance((0, 0), (30, 0))
+
+    def test_path_index_needs_a_perfect_maze(self):
+        walls = bytearray([15]) * 4
+        grid = CompactGrid(2, 2, walls)
+        grid.set_wall(0, RIGHT, False)
+        grid.set_wall(1, LEFT, False)
+        # Cells 2 and 3 are walled off from the root
+        index = PathIndex(walls, 2, 2)
+        self.assertEqual(index.distance((0, 0), (0, 1)), 1)
+        self.assertIsNone(index.distance((0, 0), (1, 0)))
+        self.assertEqual(index.path((1, 0), (1, 1)), [])
+        self.assertFalse(index.reachable((0, 1), (1, 1)))
+        # Opening all four inner walls makes a loop
+        for k, bit in ((0, BOTTOM), (2, TOP), (1, BOTTOM), (3, TOP),
+                       (2, RIGHT), (3, LEFT)):
+            grid.set_wall(k, bit, False)
+        with self.assertRaises(ValueError):
+            PathIndex(walls, 2, 2)
+
+    def test_solve_many_shares_searches_and_caches(self):
+        m = Maze(0, 0, 25, 25, 10, 10, seed=8, compact=True)
+        walls = m._wall_buffer()
+        pairs = [((0, 0), (24, 24)), ((0, 0), (3, 7)), ((12, 4), (0, 0)),
+                 ((0, 0), (24, 24))]
+        cache = solvers.SolveCache()
+        results = m.solve_many(pairs, cache=cache)
+        for (start, goal), result in zip(pairs, results):
+            self.assertEqual(result.path, m.path(start, goal))
+        # Goals with the same start come out of one search
+        self.assertEqual(results[0].nodes_expanded, results[1].nodes_expanded)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+        again = m.solve_many(pairs[:2], cache=cache)
+        self.assertEqual([r.path for r in again], [r.path for r in results[:2]])
+        self.assertEqual(cache.hits, 2)
+        # A different maze with the same size does not share entries
+        other = Maze(0, 0, 25, 25, 10, 10, seed=9, compact=True)
+        self.assertNotEqual(other.walls_key(), m.walls_key())
+        self.assertEqual(Maze(0, 0, 25, 25, 10, 10, seed=8).walls_key(), m.walls_key())
+        self.assertEqual(other.solve_many(pairs[:1], cache=cache)[0].path,
+                         other.solve(strategy="bfs").path)
+        self.assertEqual(cache.hits, 2)
+        # The same layout loaded from a file (mapped or not) shares entries too
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "m.maze")
+            m.save(path)
+            for use_mmap in (True, False):
+                loaded = Maze.load(path, use_mmap=use_mmap)
+                self.assertEqual(loaded.walls_key(), m.walls_key())
+                self.assertEqual(loaded.solve_many(pairs[:1], cache=cache)[0].path,
+                                 results[0].path)
+            self.assertEqual(cache.hits, 4)
+        self.assertEqual(len(solvers.solve_many(walls, 25, 25, [])), 0)
+        # Cells outside the maze are refused like Maze.path does, not wrapped
+        # onto another cell, and nothing is looked up or cached for them
+        looked_up = (cache.hits, cache.misses, len(cache))
+        for bad in ((0, 25), (25, 0), (-1, 3), (3, -1)):
+            with self.assertRaises(IndexError):
+                m.solve_many([((0, 0), (3, 7)), ((0, 0), bad)], cache=cache)
+            with self.assertRaises(IndexError):
+                m.solve_many([(bad, (0, 0))], cache=cache)
+            with self.assertRaises(IndexError):
+                m.path((0, 0), bad)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), looked_up)
+
+    def test_solve_cache_evicts_least_recently_used(self):
+        from array import array
+        cache = solvers.SolveCache(max_bytes=3 * (40 + solvers.SolveCache.ENTRY_OVERHEAD))
+        for n in range(3):
+            cache.put(n, array("I", range(10)))
+        cache.get(0)
+        cache.put(3, array("I", range(10)))
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get(1))
+        self.assertIsNotNone(cache.get(0))
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        # Entries larger than the whole bound are not stored
+        cache.put(4, array("I", range(1000)))
+        self.assertIsNone(cache.get(4))
+
+    def test_benchmark_report(self):
+        report = maze_bench.run_benchmarks(sizes=[6], cases=["construct", "cell_draw"])
+        self.assertEqual([r["case"] for r in report["results"]], ["construct", "cell_draw"])
+        for result in report["results"]:
+            self.assertEqual((result["rows"], result["cols"]), (6, 6))
+            self.assertGreaterEqual(result["seconds"], 0)
+            self.assertGreater(result["peak_bytes"], 0)
+        self.assertEqual(len(maze_bench.compare(report, report)), 2)
+        # Each case runs once untimed on a tiny maze, so lazy imports are loaded
+        sizes = []
+
+        def case(rows, cols, seed, algorithm):
+            return lambda: sizes.append(rows)
+        with mock.patch.dict(maze_bench.CASES, {"probe": case}):
+            maze_bench.measure("probe", 5, 5, repeat=2)
+        self.assertEqual(sizes, [2, 5, 5, 5])
+        # The recursive solver only runs where the recursion limit allows
+        report = maze_bench.run_benchmarks(sizes=[6, 101], cases=["solve_recursive"])
+        self.assertEqual([(r["case"], r["rows"]) for r in report["results"]],
+                         [("solve_recursive", 6)])
+        with self.assertRaises(ValueError):
+            maze_bench.measure("solve_recursive", 101, 101)
+
+    def test_instrumented_maze_counts_work(self):
+        win = headless_window()
+        m = Maze(0, 0, 5, 6, 10, 10, win=win, seed=3, instrument=True)
+        stats = m.stats
+        self.assertIs(win.stats, stats)
+        # The DFS enters every cell, opens the 29 walls of a spanning tree plus
+        # the entrance and exit, and steps back once out of every cell but
+        # the start
+        self.assertEqual(stats.cells_visited, 30)
+        self.assertEqual(stats.walls_broken, 31)
+        self.assertEqual(stats.backtracks, 29)
+        self.assertGreater(stats.draw_calls, 0)
+        self.assertGreater(stats.tk_updates, 0)
+        self.assertIn("generate", stats.timers)
+        visited = stats.cells_visited
+        generated = stats.backtracks
+        self.assertTrue(m.solve())
+        # Each solver step enters a cell; each undo is a backtrack
+        undos = sum(1 for _, color in win._Window__move_ids.values() if color == "gray")
+        self.assertGreaterEqual(stats.backtracks - generated, undos)
+        self.assertGreater(stats.cells_visited, visited)
+        self.assertGreaterEqual(stats.timers["solve"], 0)
+        self.assertEqual(set(stats.as_dict()["counters"]), set(MazeStats.COUNTERS))
+        # Off by default
+        self.assertIsNone(Maze(0, 0, 3, 3, 10, 10, seed=3).stats)
+        # Generators without a DFS count the openings they leave
+        m = Maze(0, 0, 5, 6, 10, 10, seed=3, compact=True, algorithm="eller",
+                 instrument=True)
+        self.assertEqual(m.stats.cells_visited, 30)
+        self.assertEqual(m.stats.walls_broken, 31)
+        self.assertEqual(m.stats.backtracks, 0)
+
+    def test_stats_export(self):
+        stats = MazeStats(profile=True)
+        m = Maze(0, 0, 20, 20, 10, 10, seed=1, compact=True, instrument=stats)
+        m.solve(strategy="bfs")
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_path = os.path.join(tmp, "trace.json")
+            stats.write_chrome_trace(trace_path)
+            with open(trace_path) as f:
+                trace = json.load(f)
+            names = [event["name"] for event in trace["traceEvents"]]
+            self.assertEqual(names, ["generate", "solve", "counters"])
+            self.assertEqual(trace["traceEvents"][-1]["args"]["cells_visited"],
+                             stats.cells_visited)
+            profile_path = os.path.join(tmp, "maze.prof")
+            stats.write_profile(profile_path)
+            functions = {key[2] for key in pstats.Stats(profile_path).stats}
+            self.assertIn("carve_dfs", functions)
+        with self.assertRaises(ValueError):
+            MazeStats().write_profile("unused.prof")
+
+    def test_viewport_zoom_and_pan(self):
+        view = Viewport(800, 600, 2000, 2000)
+        self.assertEqual(view.visible_cells(), (0, 2000, 0, 2000))
+        self.assertAlmostEqual(view.scale, 0.3)
+        # Zooming keeps the cell under the pointer in place
+        before = ((400 - view.offset_x) / view.scale, (300 - view.offset_y) / view.scale)
+        for _ in range(20):
+            view.zoom(1.25, 400, 300)
+        after = ((400 - view.offset_x) / view.scale, (300 - view.offset_y) / view.scale)
+        self.assertAlmostEqual(before[0], after[0])
+        self.assertAlmostEqual(before[1], after[1])
+        r0, r1, c0, c1 = view.visible_cells()
+        self.assertLess((r1 - r0) * (c1 - c0), 20000)
+        view.pan(-10 * view.scale, 0)
+        self.assertEqual(view.visible_cells()[2], c0 + 10)
+        # Zoom is bounded both ways
+        for _ in range(100):
+            view.zoom(0.5, 0, 0)
+        self.assertAlmostEqual(view.scale, 0.15)
+        for _ in range(100):
+            view.zoom(2, 0, 0)
+        self.assertEqual(view.scale, Viewport.MAX_SCALE)
+
+    def test_view_segments_are_culled(self):
+        m = Maze(0, 0, 200, 200, 1, 1, seed=2, compact=True)
+        walls = m._wall_buffer()
+        view = Viewport(100, 100, 200, 200)
+        view.zoom(10, 0, 0)
+        view.pan(-30, -40)
+        r0, r1, c0, c1 = view.visible_cells()
+        self.assertEqual((r0, r1, c0, c1), (8, 28, 6, 26))
+        segments = view_segments(walls, view)
+        self.assertTrue(segments)
+        for x1, y1, x2, y2 in segments:
+            self.assertTrue(-view.scale <= min(x1, x2) and max(x1, x2) <= 100 + view.scale)
+            self.assertTrue(-view.scale <= min(y1, y2) and max(y1, y2) <= 100 + view.scale)
+        # Fully zoomed in, only the cells in view are drawn at all
+        self.assertLess(len(segments), len(m._wall_segments()) // 50)
+
+    def test_lod_image_matches_view_scale(self):
+        m = Maze(0, 0, 300, 400, 1, 1, seed=2, compact=True, algorithm="binary_tree")
+        walls = m._wall_buffer()
+        view = Viewport(800, 600, 300, 400)
+        # The initial fit, zoomed in and out about a point, and panned
+        for factor, x, y in ((1, 0, 0), (1.25, 100, 50), (1.6, 400, 300),
+                             (0.8, 20, 500), (1.25, 700, 10)):
+            view.zoom(factor, x, y)
+            view.pan(-13, 7)
+            r0, r1, c0, c1 = view.visible_cells()
+            data = lod_image(walls, view)
+            width, height = map(int, data.split(b"\n", 1)[0].split()[1:3])
+            self.assertLessEqual(abs(width - (c1 - c0) * view.scale), view.scale)
+            self.assertLessEqual(abs(height - (r1 - r0) * view.scale), view.scale)
+            self.assertEqual(len(data.split(b"\n", 1)[1]), width * height)
+        # At scale 1 every pixel is one cell, shaded by its wall count
+        view = Viewport(400, 300, 300, 400)
+        self.assertEqual(view.scale, 1)
+        data = lod_image(walls, view)
+        header = b"P5 400 300 255\n"
+        self.assertTrue(data.startswith(header))
+        self.assertEqual(data[len(header):], bytes(walls).translate(window._LOD_SHADES))
+
+    def test_core_import_stays_headless(self):
+        # Headless code must not pull in Tk, Pillow or (until needed) numpy
+        result = maze_bench.import_time("maze", repeat=1)
+        self.assertEqual(result["loads"], {"tkinter": False, "PIL": False})
+        import subprocess
+        import sys
+        code = ("import sys, batch; m = batch.build_maze(1, 5, 5); "
+                "print(sorted({'tkinter', 'PIL', 'numpy'} & set(sys.modules)))")
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), "[]")
+        # window still re-exports the core classes
+        import maze
+        import window
+        self.assertIs(window.Maze, maze.Maze)
+        self.assertIs(window.Cell, maze.Cell)
+
+    def test_service_dedupes_and_caches(self):
+        async def fetch(port, target):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            head, body = response.split(b"\r\n\r\n", 1)
+            return int(head.split()[1]), body
+
+        async def run(cache_dir):
+            svc = service.MazeService(cache_dir, workers=1)
+            server = await asyncio.start_server(svc.handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                target = "/maze?rows=30&cols=40&seed=5&algorithm=eller"
+                first = await asyncio.gather(*(fetch(port, target) for _ in range(5)))
+                again = await fetch(port, target)
+                bad = await fetch(port, "/maze?rows=3&cols=x&seed=1")
+                unknown = await fetch(port, "/maze?rows=3&cols=3&seed=1&algorithm=nope")
+                stats = json.loads((await fetch(port, "/stats"))[1])
+            finally:
+                server.close()
+                await server.wait_closed()
+                svc.close()
+            return first, again, bad, unknown, stats
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first, again, bad, unknown, stats = asyncio.run(run(tmp))
+            self.assertEqual({status for status, _ in first}, {200})
+            self.assertEqual(len({body for _, body in first}), 1)
+            self.assertEqual(again, first[0])
+            self.assertEqual((bad[0], unknown[0]), (400, 400))
+            # Five concurrent requests built one maze; the repeat came from disk
+            self.assertEqual(stats["generated"], 1)
+            self.assertEqual(stats["deduplicated"], 4)
+            self.assertEqual(stats["cache_hits"], 1)
+            path = os.path.join(tmp, "maze.maze")
+            with open(path, "wb") as f:
+                f.write(first[0][1])
+            loaded = Maze.load(path, use_mmap=False)
+            self.assertEqual(bytes(loaded._cells.walls),
+                             bytes(Maze(0, 0, 30, 40, 1, 1, seed=5, algorithm="eller",
+                                        compact=True)._cells.walls))
+
+    def test_counter_random_streams_are_seekable(self):
+        a = rng.CounterRandom(42)
+        draws = [a.randrange(1000) for _ in range(40000)]
+        self.assertEqual(a.tell(), 40000)
+        self.assertTrue(all(0 <= d < 1000 for d in draws))
+        # Any position can be reached without drawing what comes before it
+        for n in (0, 3, 17, 16384, 39999):
+            b = rng.CounterRandom(42)
+            b.seek(n)
+            self.assertEqual(b.randrange(1000), draws[n])
+        self.assertNotEqual([rng.CounterRandom(42, stream=1).randrange(1000)
+                             for _ in range(20)], draws[:20])
+        self.assertTrue(0 <= rng.CounterRandom(42).random() < 1)
+        self.assertEqual(rng.seed_key(-1), 2**64 - 1)
+
+    def test_chunked_generators_are_independent_of_later_chunks(self):
+        # Each chunk of rows has its own stream, so a shorter maze with the same
+        # seed shares every row that no later chunk touches
+        for algorithm in ("binary_tree", "sidewinder"):
+            tall = generators.generate(algorithm, 600, 20, seed=3)
+            short = generators.generate(algorithm, 300, 20, seed=3)
+            self.assertEqual(tall[:255 * 20], short[:255 * 20], algorithm)
+            self.assertEqual(generators.generate(algorithm, 600, 20, seed=3), tall)
+
+    def test_tiled_generation_is_one_perfect_maze(self):
+        rows, cols = 70, 90
+        for algorithm in tiled.TILE_ALGORITHMS:
+            walls = tiled.generate_tiled(rows, cols, seed=4, tile=16, workers=1,
+                                         algorithm=algorithm)
+            self.assertEqual(count_reachable(walls, rows, cols), rows * cols, algorithm)
+            self.assertEqual(count_openings(walls, rows, cols), rows * cols - 1, algorithm)
+        # Tiles carved in worker processes give the same maze as in-process
+        shared = tiled.generate_tiled(rows, cols, seed=4, tile=16, workers=2,
+                                      algorithm="sidewinder")
+        self.assertEqual(shared, walls)
+        m = Maze(0, 0, 40, 50, 10, 10, seed=4, compact=True, algorithm="tiled")
+        self.assertTrue(m.solve())
+        self.assertEqual(m.solve("bfs").path, m.path((0, 0), (39, 49)))
+        with self.assertRaises(ValueError):
+            tiled.generate_tiled(10, 10, algorithm="tiled")
+        # The registered generator spans several tiles without a process pool
+        with mock.patch("tiled.ProcessPoolExecutor") as pool:
+            walls = generators.generate("tiled", tiled.DEFAULT_TILE + 10, 3, seed=4)
+        pool.assert_not_called()
+        self.assertEqual(count_openings(walls, tiled.DEFAULT_TILE + 10, 3),
+                         (tiled.DEFAULT_TILE + 10) * 3 - 1)
+
+    def test_tiled_cli_header_rebuilds_the_maze(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "t.maze")
+            with mock.patch("sys.stdout", io.StringIO()):
+                tiled.main(["--rows", "30", "--cols", "40", "--seed", "6", "--tile", "16",
+                            "--algorithm", "eller", "--workers", "1", "--out", path])
+            header, walls = mazefile.load(path, use_mmap=False)
+            self.assertEqual((header["algorithm"], header["tile"], header["tile_algorithm"]),
+                             ("tiled", 16, "eller"))
+            rebuilt = tiled.generate_tiled(30, 40, header["seed"], header["tile"],
+                                           workers=1, algorithm=header["tile_algorithm"])
+            rebuilt[0] &= ~TOP
+            rebuilt[-1] &= ~BOTTOM
+            self.assertEqual(walls, rebuilt)
+            # Files from other generators record no tiling
+            Maze(0, 0, 3, 3, 10, 10, seed=1, compact=True).save(path)
+            with open(path, "rb") as f:
+                header = mazefile.read_header(f)
+            self.assertIsNone(header["tile"])
+            self.assertIsNone(header["tile_algorithm"])
+            with self.assertRaises(ValueError):
+                mazefile.save(path, bytearray(1), 1, 1, algorithm="tiled", tile=1 << 16)
+        with mock.patch("sys.stderr", io.StringIO()), self.assertRaises(SystemExit):
+            tiled.main(["--rows", "3", "--cols", "3", "--tile", "0"])
+
+    def test_analyze_matches_plain_python(self):
+        for algorithm in ("dfs", "eller", "binary_tree", "sidewinder"):
+            for rows, cols in ((1, 1), (1, 6), (7, 1), (2, 2), (23, 31)):
+                m = Maze(0, 0, rows, cols, 10, 10, seed=5, compact=True,
+                         algorithm=algorithm)
+                result = m.analyze()
+                self.assertEqual(result.solution_length, len(m.solve("bfs").path) - 1)
+                with mock.patch("grid._numpy", None):
+                    plain = m.analyze()
+                self.assertEqual(result.as_dict(), plain.as_dict(), (algorithm, rows, cols))
+                # Without the tour the path metrics are left out, the rest agree
+                expected = dict(result.as_dict(), solution_length=None, tortuosity=None,
+                                longest_corridor=None)
+                self.assertEqual(m.analyze(paths=False).as_dict(), expected)
+                with mock.patch("grid._numpy", None):
+                    self.assertEqual(m.analyze(paths=False).as_dict(), expected)
+                degrees = list(self._degrees(m._cells.walls, rows, cols))
+                self.assertEqual(result.dead_ends, degrees.count(1))
+                self.assertEqual(result.junctions, len(degrees) - degrees.count(0)
+                                 - degrees.count(1) - degrees.count(2))
+        m = Maze(0, 0, 23, 31, 10, 10, seed=5, compact=True)
+        between = m.analyze(start=(4, 20), goal=(17, 3))
+        self.assertEqual(between.solution_length, m.distance((4, 20), (17, 3)))
+        self.assertAlmostEqual(between.tortuosity, between.solution_length / 30)
+        # A Cell-backed maze keeps its flat walls instead of rebuilding them
+        cells = Maze(0, 0, 23, 31, 10, 10, seed=5)
+        with mock.patch("maze.walls_from_cells") as rebuild:
+            self.assertEqual(cells.analyze().as_dict(), m.analyze().as_dict())
+        rebuild.assert_not_called()
+
+    def _degrees(self, walls, rows, cols):
+        for k in range(rows * cols):
+            i, j = divmod(k, cols)
+            w = walls[k]
+            yield ((i > 0 and not w & TOP) + (j < cols - 1 and not w & RIGHT)
+                   + (i < rows - 1 and not w & BOTTOM) + (j > 0 and not w & LEFT))
+
+    def test_analyze_corridor_and_bad_mazes(self):
+        # A single 1x5 corridor with the entrance and exit open
+        walls = bytearray([15]) * 5
+        grid = CompactGrid(1, 5, walls)
+        for k in range(4):
+            grid.set_wall(k, RIGHT, False)
+            grid.set_wall(k + 1, LEFT, False)
+        grid.set_wall(0, TOP, False)
+        grid.set_wall(4, BOTTOM, False)
+        result = analysis.analyze(walls, 1, 5)
+        self.assertEqual(result.as_dict(), {
+            "dead_ends": 2, "junctions": 0, "solution_length": 4, "tortuosity": 1.0,
+            "longest_corridor": 4, "river": 4.0, "branching_factor": 0.0,
+        })
+        # 2x3: a loop on the left and a detached pair on the right; the
+        # number of openings alone (cells - 1) does not give it away
+        walls = bytearray([15]) * 6
+        grid = CompactGrid(2, 3, walls)
+        for k, bit in ((0, RIGHT), (1, LEFT), (3, RIGHT), (4, LEFT), (0, BOTTOM),
+                       (3, TOP), (1, BOTTOM), (4, TOP), (2, BOTTOM), (5, TOP)):
+            grid.set_wall(k, bit, False)
+        with self.assertRaises(ValueError):
+            analysis.analyze(walls, 2, 3)
+        with mock.patch("grid._numpy", None), self.assertRaises(ValueError):
+            analysis.analyze(walls, 2, 3)
+
+    def test_maze_philox_rng(self):
+        for algorithm in ("dfs", "eller"):
+            a = Maze(0, 0, 20, 25, 10, 10, seed=9, compact=True, rng="philox",
+                     algorithm=algorithm)
+            b = Maze(0, 0, 20, 25, 10, 10, seed=9, compact=True, rng="philox",
+                     algorithm=algorithm)
+            legacy = Maze(0, 0, 20, 25, 10, 10, seed=9, compact=True, algorithm=algorithm)
+            self.assertEqual(bytes(a._cells.walls), bytes(b._cells.walls))
+            self.assertNotEqual(bytes(a._cells.walls), bytes(legacy._cells.walls))
+            self.assertEqual(count_reachable(a._cells.walls, 20, 25), 500)
+            self.assertEqual(count_openings(a._cells.walls, 20, 25), 499)
+        with self.assertRaises(ValueError):
+            Maze(0, 0, 2, 2, 10, 10, rng="lcg")
+
+    def test_maze_file_records_rng(self):
+        # The header must say how to rebuild the maze: seed, algorithm and rng
+        with tempfile.TemporaryDirectory() as tmp:
+            for rng_kind in ("philox", None):
+                path = os.path.join(tmp, f"{rng_kind}.maze")
+                m = Maze(0, 0, 12, 15, 10, 10, seed=5, compact=True, rng=rng_kind)
+                m.save(path)
+                with open(path, "rb") as f:
+                    header = mazefile.read_header(f)
+                self.assertEqual(header["rng"], rng_kind)
+                for use_mmap in (True, False):
+                    loaded = Maze.load(path, use_mmap=use_mmap)
+                    self.assertEqual(loaded._rng_kind, rng_kind)
+                    rebuilt = Maze(0, 0, 12, 15, 10, 10, seed=loaded._seed, compact=True,
+                                   algorithm=loaded._algorithm, rng=loaded._rng_kind)
+                    self.assertEqual(list(loaded._cells.walls), list(rebuilt._cells.walls))
+                # Re-saving keeps the flag
+                copy = os.path.join(tmp, "copy.maze")
+                Maze.load(path).save(copy)
+                with open(path, "rb") as a, open(copy, "rb") as b:
+                    self.assertEqual(a.read(), b.read())
+            with self.assertRaises(ValueError):
+                mazefile.save(os.path.join(tmp, "x.maze"), bytearray(4), 2, 2, rng="lcg")
+
+    def test_event_log_records_generation_and_solve(self):
+        m = Maze(0, 0, 6, 5, 10, 10, seed=2, record=True)
+        log = m.events
+        self.assertEqual(log.count(events.VISIT), 30)
+        # A spanning tree has cells - 1 breaks, plus the entrance and exit
+        self.assertEqual(log.count(events.BREAK), 31)
+        self.assertEqual(bytes(events.wall_state(log)), bytes(m._wall_buffer()))
+        self.assertTrue(m.solve())
+        moves = log.count(events.MOVE)
+        undos = log.count(events.UNDO)
+        self.assertGreater(moves, 0)
+        self.assertEqual(moves - undos, len(m.solve(strategy="bfs").path) - 1)
+        # Compact mazes record the same stream
+        c = Maze(0, 0, 6, 5, 10, 10, seed=2, record=True, compact=True)
+        self.assertEqual(list(c.events), list(log)[:len(c.events)])
+        self.assertIsNone(Maze(0, 0, 2, 2, 10, 10).events)
+
+    def test_event_log_packing(self):
+        log = events.EventLog(5000, 5000)
+        log.append(events.UNDO, 4999, 1234, LEFT)
+        self.assertEqual(log[0], (events.UNDO, 4999, 1234, LEFT))
+        self.assertEqual(log.records.itemsize, 8)
+
+    def test_replay_matches_live_drawing(self):
+        live = StubWindow()
+        m = Maze(0, 0, 4, 4, 10, 10, win=live, seed=3, record=True)
+        m.solve()
+        replayed = StubWindow()
+        replayer = events.Replayer(m.events, replayed, 0, 0, 10, 10)
+        replayer.replay(steps_per_second=1000)
+        # The last color drawn for every move line matches the live run
+        live_moves = {line[:4]: line[4] for line in live.lines if line[4] in ("red", "gray")}
+        replayed_moves = {line[:4]: line[4] for line in replayed.lines
+                          if line[4] in ("red", "gray")}
+        self.assertEqual(replayed_moves, live_moves)
+        # Skipping ahead applies earlier events in one jump
+        skipped = StubWindow()
+        events.Replayer(m.events, skipped, 0, 0, 10, 10).replay(start=len(m.events))
+        self.assertEqual(skipped.frames, [])
+
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
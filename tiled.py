@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+tiled.py
+
+Parallel generation of very large mazes. The grid is cut into square tiles
+and each worker process carves a perfect maze inside one tile, straight
+into a shared memory wall buffer. The tiles are then joined along a random
+spanning tree over the tile grid: one seam wall is opened for every tree
+edge, so the whole grid is still a perfect maze (one path between any two
+cells) and Maze.solve works on it as usual.
+
+Every random choice is drawn from a Philox stream (rng.py) keyed by the seed
+and the tile index, so a seed gives the same maze whatever the number of
+workers and whatever order the tiles finish in.
+
+Usage:
+    python tiled.py --rows 20000 --cols 20000 --seed 7 --workers 8 --out big.maze
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import generators
+from grid import TOP, RIGHT, BOTTOM, LEFT, ALL_WALLS
+import mazefile
+from rng import CounterRandom, seed_key
+
+DEFAULT_TILE = 1024
+# Generators that can fill a tile; they all leave every tile border walled.
+# .maze headers record one by its index here, so the order is fixed.
+TILE_ALGORITHMS = mazefile.TILE_ALGORITHMS
+
+
+def _tiles(num_rows, num_cols, tile):
+    # (index, r0, r1, c0, c1) for every tile, row-major
+    index = 0
+    for r0 in range(0, num_rows, tile):
+        for c0 in range(0, num_cols, tile):
+            yield index, r0, min(r0 + tile, num_rows), c0, min(c0 + tile, num_cols)
+            index += 1
+
+
+def carve_tile(walls, num_cols, r0, r1, c0, c1, key, stream, algorithm="dfs"):
+    """Write a perfect maze for rows r0:r1, columns c0:c1 into the flat buffer walls."""
+    width = c1 - c0
+    # dfs and eller take the stream as their rng; the numpy generators key
+    # their own per-chunk streams from (key, stream) as a seed
+    block = generators.generate(algorithm, r1 - r0, width, (key, stream),
+                                CounterRandom(key, stream))
+    for i in range(r0, r1):
+        k = i * num_cols + c0
+        start = (i - r0) * width
+        walls[k:k + width] = block[start:start + width]
+
+
+def _carve_shared(job):
+    # Worker: attach to the shared buffer by name and fill one tile
+    name, num_cols, r0, r1, c0, c1, key, stream, algorithm = job
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        carve_tile(shm.buf, num_cols, r0, r1, c0, c1, key, stream, algorithm)
+    finally:
+        shm.close()
+    return stream
+
+
+def stitch(walls, num_rows, num_cols, tile, key):
+    """
+    Join separately carved tiles into one perfect maze. A randomized DFS over
+    the tile grid picks a spanning tree of tiles; for each of its edges one
+    cell pair along the shared border gets its wall opened. Returns the
+    number of seam walls opened (tiles - 1).
+    """
+    tile_rows = -(-num_rows // tile)
+    tile_cols = -(-num_cols // tile)
+    # The stream after the last tile's, so it never overlaps a tile's draws
+    rng = CounterRandom(key, tile_rows * tile_cols)
+    tree = bytearray([ALL_WALLS]) * (tile_rows * tile_cols)
+    generators.carve_dfs(tile_rows, tile_cols, rng, walls=tree)
+
+    opened = 0
+    for t, r0, r1, c0, c1 in _tiles(num_rows, num_cols, tile):
+        if not tree[t] & RIGHT:
+            i = r0 + rng.randrange(r1 - r0)
+            k = i * num_cols + c1 - 1
+            walls[k] &= ~RIGHT
+            walls[k + 1] &= ~LEFT
+            opened += 1
+        if not tree[t] & BOTTOM:
+            j = c0 + rng.randrange(c1 - c0)
+            k = (r1 - 1) * num_cols + j
+            walls[k] &= ~BOTTOM
+            walls[k + num_cols] &= ~TOP
+            opened += 1
+    return opened
+
+
+def generate_tiled(num_rows, num_cols, seed=None, tile=DEFAULT_TILE, workers=None,
+                   algorithm="dfs"):
+    """
+    Build a num_rows x num_cols perfect maze from tile x tile blocks carved
+    in parallel, and return its flat wall bytearray.
+
+    - workers: pool size (defaults to the CPU count); with 1 worker, or a
+      maze that fits in one tile, everything runs in-process.
+    - algorithm: generator used inside each tile, one of TILE_ALGORITHMS.
+    """
+    if algorithm not in TILE_ALGORITHMS:
+        raise ValueError(
+            f"unknown tile algorithm {algorithm!r}, expected one of {TILE_ALGORITHMS}"
+        )
+    if tile < 1:
+        raise ValueError("tile must be at least 1")
+    key = seed_key(seed)
+    size = num_rows * num_cols
+    tiles = list(_tiles(num_rows, num_cols, tile))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(tiles) <= 1:
+        walls = bytearray(size)
+        for t, r0, r1, c0, c1 in tiles:
+            carve_tile(walls, num_cols, r0, r1, c0, c1, key, t, algorithm)
+        stitch(walls, num_rows, num_cols, tile, key)
+        return walls
+
+    # The tiles cover every cell, so the buffer needs no initial fill
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        jobs = [(shm.name, num_cols, r0, r1, c0, c1, key, t, algorithm)
+                for t, r0, r1, c0, c1 in tiles]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tiles))) as pool:
+            for _ in pool.map(_carve_shared, jobs):
+                pass
+        walls = bytearray(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+    stitch(walls, num_rows, num_cols, tile, key)
+    return walls
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a giant maze from parallel tiles.")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--cols", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tile", type=int, default=DEFAULT_TILE,
+                        help="side length of the square tiles carved by each job")
+    parser.add_argument("--algorithm", default="dfs", choices=TILE_ALGORITHMS,
+                        help="generator used inside each tile")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="tiled.maze")
+    args = parser.parse_args(argv)
+    if not 0 < args.tile <= mazefile.MAX_TILE:
+        # Checked up front, as the tile side is saved in the maze file header
+        parser.error(f"--tile must be between 1 and {mazefile.MAX_TILE}")
+
+    began = time.perf_counter()
+    walls = generate_tiled(args.rows, args.cols, args.seed, args.tile, args.workers,
+                           args.algorithm)
+    # Entrance and exit, as Maze opens them
+    walls[0] &= ~TOP
+    walls[-1] &= ~BOTTOM
+    elapsed = time.perf_counter() - began
+    # Seed, tile side and tile algorithm together rebuild the maze with
+    # generate_tiled
+    mazefile.save(args.out, walls, args.rows, args.cols, args.seed, "tiled",
+                  tile=args.tile, tile_algorithm=args.algorithm)
+    cells = args.rows * args.cols
+    print(f"Wrote {args.rows}x{args.cols} maze to {args.out} in {elapsed:.1f}s "
+          f"({cells / elapsed / 1e6:.2f}M cells/s)")
+
+
+if __name__ == "__main__":
+    main()
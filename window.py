@@ -1,275 +1,271 @@
-from tkinter import Tk, BOTH, Canvas
+from tkinter import Tk, BOTH, BooleanVar, Canvas, PhotoImage
+import math
 import time
-import random
+from grid import ALL_WALLS, wall_segments
+import mazefile
+from stats import phase
+# The Tk-free core, re-exported so `from window import Maze` keeps working
+from maze import Point, Line, FrameScheduler, Cell, Maze
 
-class Point:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-
-class Line:
-    def __init__(self, p1, p2):
-        self.p1 = p1
-        self.p2 = p2
-    
-    def draw(self, canvas, fill_color):
-        canvas.create_line(
-            self.p1.x, self.p1.y, self.p2.x, self.p2.y, 
-            fill=fill_color, width=2
-        )
+# Screen pixels per cell below which a maze view is drawn as a bitmap
+LOD_THRESHOLD = 4
+# Gray level of a cell in the bitmap, by its wall count: dead ends are darkest
+_LOD_SHADES = bytes(
+    (235, 205, 160, 100, 40)[bin(w & ALL_WALLS).count("1")] for w in range(256)
+)
 
 class Window:
-    def __init__(self, width, height):
+    def __init__(self, width, height, fps=60):
         self.__root = Tk()
         self.__root.title("Maze Solver")
         self.__canvas = Canvas(self.__root, width=width, height=height)
         self.__canvas.pack(fill=BOTH, expand=1)
         self.__running = False
+        self.__closed = False
         self.__root.protocol("WM_DELETE_WINDOW", self.close)
+        self.fps = fps
+        # Written by root.after when the next animation frame is due
+        self.__frame_due = BooleanVar(self.__root)
+        self.__next_frame = 0.0
+        # Canvas items keyed by their end points, so redraws recolor in place
+        self.__wall_ids = {}
+        self.__move_ids = {}
+        # Optional MazeStats; a Maze created with instrument=True attaches its own
+        self.stats = None
+        # Zoomable view of a finished maze, set up by show_maze
+        self.__view = None
+        self.__view_walls = None
+        self.__view_image = None
+        self.__view_pending = None
+        self.__drag = None
     
     def redraw(self):
-        self.__root.update_idletasks()
-        self.__root.update()
+        with phase(self.stats, "tk_update"):
+            if self.stats is not None:
+                self.stats.tk_updates += 1
+            self.__root.update_idletasks()
+            self.__root.update()
+
+    def wait_frame(self, interval):
+        # Let Tk run its event loop (painting, resizes, close) until the next
+        # frame is due, instead of blocking in time.sleep
+        if self.__closed:
+            return
+        now = time.perf_counter()
+        delay_ms = int((self.__next_frame - now) * 1000)
+        if delay_ms > 0:
+            with phase(self.stats, "wait"):
+                if self.stats is not None:
+                    self.stats.tk_updates += 1
+                self.__root.after(delay_ms, self.__frame_due.set, True)
+                self.__root.wait_variable(self.__frame_due)
+        else:
+            self.redraw()
+        self.__next_frame = max(self.__next_frame, now) + interval
 
     def wait_for_close(self):
         self.__running = True
-        while self.__running:
+        while self.__running and not self.__closed:
             self.redraw()
 
     def close(self):
         self.__running = False
+        self.__closed = True
 
     def draw_line(self, line, fill_color):
+        if self.stats is not None:
+            self.stats.draw_calls += 1
         line.draw(self.__canvas, fill_color)
 
-class Cell:
-    def __init__(self, win=None):
-        self.has_left_wall = True
-        self.has_right_wall = True
-        self.has_top_wall = True
-        self.has_bottom_wall = True
-        self.visited = False
-        self._x1 = None
-        self._x2 = None
-        self._y1 = None
-        self._y2 = None
-        self._win = win
-        
-    def draw(self, x1, y1, x2, y2):
-        self._x1 = x1
-        self._x2 = x2
-        self._y1 = y1
-        self._y2 = y2
-        
-        if self._win is None:
+    def draw_segments(self, segments, fill_color):
+        # Draw (x1, y1, x2, y2) tuples directly, without Line/Point objects
+        create_line = self.__canvas.create_line
+        calls = 0
+        for x1, y1, x2, y2 in segments:
+            create_line(x1, y1, x2, y2, fill=fill_color, width=2)
+            calls += 1
+        if self.stats is not None:
+            self.stats.draw_calls += calls
+
+    def draw_wall(self, x1, y1, x2, y2, fill_color):
+        # A wall shared by two cells has the same key from both sides
+        self.__draw_item(self.__wall_ids, (x1, y1, x2, y2), fill_color)
+
+    def draw_move(self, x1, y1, x2, y2, fill_color):
+        self.__draw_item(self.__move_ids, (x1, y1, x2, y2), fill_color)
+
+    def __draw_item(self, index, coords, fill_color):
+        if self.stats is not None:
+            self.stats.draw_calls += 1
+        key = tuple(round(v, 3) for v in coords)
+        entry = index.get(key)
+        if entry is None:
+            item = self.__canvas.create_line(*coords, fill=fill_color, width=2)
+            index[key] = [item, fill_color]
+        elif entry[1] != fill_color:
+            self.__canvas.itemconfig(entry[0], fill=fill_color)
+            entry[1] = fill_color
+
+    def clear(self):
+        self.__canvas.delete("all")
+        self.__wall_ids.clear()
+        self.__move_ids.clear()
+
+    def show_maze(self, walls, num_rows, num_cols):
+        """
+        Show a finished maze (flat wall buffer) in a view that only draws the
+        visible cells, switches to a one-pixel-per-cell bitmap when zoomed
+        out, zooms with the mouse wheel and pans by dragging.
+        """
+        if isinstance(walls, mazefile.NibbleArray):
+            walls = mazefile.unpack(walls.packed(), num_rows * num_cols)
+        self.__view_walls = walls
+        self.__view = Viewport(
+            int(self.__canvas.cget("width")), int(self.__canvas.cget("height")),
+            num_rows, num_cols,
+        )
+        canvas = self.__canvas
+        canvas.bind("<MouseWheel>", self.__on_wheel)
+        canvas.bind("<Button-4>", self.__on_wheel)   # X11 wheel up
+        canvas.bind("<Button-5>", self.__on_wheel)   # X11 wheel down
+        canvas.bind("<ButtonPress-1>", self.__on_press)
+        canvas.bind("<B1-Motion>", self.__on_drag)
+        canvas.bind("<Configure>", self.__on_resize)
+        self.__render_view()
+
+    def __schedule_view(self):
+        # Coalesce bursts of wheel and motion events into one render
+        if self.__view_pending is None:
+            self.__view_pending = self.__root.after_idle(self.__render_view)
+
+    def __on_wheel(self, event):
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.__view.zoom(1.25 if zoom_in else 0.8, event.x, event.y)
+        self.__schedule_view()
+
+    def __on_press(self, event):
+        self.__drag = (event.x, event.y)
+
+    def __on_drag(self, event):
+        dx = event.x - self.__drag[0]
+        dy = event.y - self.__drag[1]
+        self.__drag = (event.x, event.y)
+        self.__view.pan(dx, dy)
+        # Move what is already drawn right away; newly exposed cells follow
+        self.__canvas.move("all", dx, dy)
+        self.__schedule_view()
+
+    def __on_resize(self, event):
+        self.__view.resize(event.width, event.height)
+        self.__schedule_view()
+
+    def __render_view(self):
+        self.__view_pending = None
+        view = self.__view
+        self.clear()
+        self.__view_image = None
+        r0, r1, c0, c1 = view.visible_cells()
+        if r0 >= r1 or c0 >= c1:
             return
-            
-        # Draw all walls, using white for removed walls
-        line = Line(Point(x1, y1), Point(x1, y2))
-        self._win.draw_line(line, "black" if self.has_left_wall else "#d9d9d9")
-        
-        line = Line(Point(x1, y1), Point(x2, y1))
-        self._win.draw_line(line, "black" if self.has_top_wall else "#d9d9d9")
-        
-        line = Line(Point(x2, y1), Point(x2, y2))
-        self._win.draw_line(line, "black" if self.has_right_wall else "#d9d9d9")
-        
-        line = Line(Point(x1, y2), Point(x2, y2))
-        self._win.draw_line(line, "black" if self.has_bottom_wall else "#d9d9d9")
-
-    def draw_move(self, to_cell, undo=False):
-        if self._win is None:
+        x0, y0 = view.cell_origin(r0, c0)
+        if view.scale >= LOD_THRESHOLD:
+            self.draw_segments(view_segments(self.__view_walls, view), "black")
             return
-            
-        # Calculate center points of both cells
-        from_x = (self._x1 + self._x2) // 2
-        from_y = (self._y1 + self._y2) // 2
-        to_x = (to_cell._x1 + to_cell._x2) // 2
-        to_y = (to_cell._y1 + to_cell._y2) // 2
-        
-        # Draw the line with appropriate color
-        line = Line(Point(from_x, from_y), Point(to_x, to_y))
-        self._win.draw_line(line, "gray" if undo else "red")
-
-class Maze:
-    def __init__(
-            self,
-            x1,
-            y1,
-            num_rows,
-            num_cols,
-            cell_size_x,
-            cell_size_y,
-            win=None,
-            seed=None,
-        ):
-        if seed is not None:
-            random.seed(seed)
-            
-        self._x1 = x1
-        self._y1 = y1
-        self._num_rows = num_rows
-        self._num_cols = num_cols
-        self._cell_size_x = cell_size_x
-        self._cell_size_y = cell_size_y
-        self._win = win
-        self._cells = []
-        
-        self._create_cells()
-        self._break_walls_r(0, 0)  # DFS maze generation
-        self._break_entrance_and_exit()  # Open the exterior at entrance/exit
-        self._reset_cells_visited()      # Reset visited flags for solving
-    
-    def _break_walls_r(self, i, j):
-        # Set recursion limit for large mazes
-        import sys
-        sys.setrecursionlimit(10000)
-        
-        self._cells[i][j].visited = True
-        self._draw_cell(i, j)  # Draw cell after marking as visited
-        
-        while True:
-            possible_dirs = []
-            
-            # Check all adjacent cells (up, right, down, left)
-            # Up
-            if i > 0 and not self._cells[i-1][j].visited:
-                possible_dirs.append((i-1, j, "up"))
-            # Right
-            if j < self._num_cols-1 and not self._cells[i][j+1].visited:
-                possible_dirs.append((i, j+1, "right"))
-            # Down
-            if i < self._num_rows-1 and not self._cells[i+1][j].visited:
-                possible_dirs.append((i+1, j, "down"))
-            # Left
-            if j > 0 and not self._cells[i][j-1].visited:
-                possible_dirs.append((i, j-1, "left"))
-            
-            # If no unvisited neighbors, we're done with this cell
-            if len(possible_dirs) == 0:
-                return
-            
-            # Choose random direction and break walls
-            next_i, next_j, direction = random.choice(possible_dirs)
-            
-            if direction == "up":
-                self._cells[i][j].has_top_wall = False
-                self._cells[next_i][next_j].has_bottom_wall = False
-            elif direction == "right":
-                self._cells[i][j].has_right_wall = False
-                self._cells[next_i][next_j].has_left_wall = False
-            elif direction == "down":
-                self._cells[i][j].has_bottom_wall = False
-                self._cells[next_i][next_j].has_top_wall = False
-            elif direction == "left":
-                self._cells[i][j].has_left_wall = False
-                self._cells[next_i][next_j].has_right_wall = False
-            
-            # Recursively visit the next cell
-            self._break_walls_r(next_i, next_j)
-    
-    def _create_cells(self):
-        # Initialize the grid of cells
-        self._cells = [[Cell(self._win) for col in range(self._num_cols)] 
-                      for row in range(self._num_rows)]
-        
-        # Draw each cell
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                self._draw_cell(i, j)
-    
-    def _draw_cell(self, i, j):
-        # Calculate the cell's position
-        x1 = self._x1 + j * self._cell_size_x
-        y1 = self._y1 + i * self._cell_size_y
-        x2 = x1 + self._cell_size_x
-        y2 = y1 + self._cell_size_y
-        
-        # Draw the cell
-        self._cells[i][j].draw(x1, y1, x2, y2)
-        self._animate()
-    
-    def _animate(self):
-        if self._win is None:
-            return
-        self._win.redraw()
-        # Scale delay exponentially down for larger mazes
-        total_cells = self._num_rows * self._num_cols
-        delay = min(0.05, 1 / total_cells)
-        time.sleep(delay)
-
-    def _reset_cells_visited(self):
-        # Reset visited flag for all cells
-        for i in range(self._num_rows):
-            for j in range(self._num_cols):
-                self._cells[i][j].visited = False
-
-    def solve(self):
-        self._reset_cells_visited()  # Reset visited flags for solving
-        return self._solve_r(0, 0)
-    
-    def _solve_r(self, i, j):
-        self._animate()
-        self._cells[i][j].visited = True
-        
-        # If we reached the end cell (bottom-right)
-        if i == self._num_rows - 1 and j == self._num_cols - 1:
-            return True
-            
-        # Try each direction (up, right, down, left)
-        # Up
-        if (i > 0 and 
-            not self._cells[i][j].has_top_wall and 
-            not self._cells[i-1][j].visited):
-            self._cells[i][j].draw_move(self._cells[i-1][j])
-            if self._solve_r(i-1, j):
-                return True
-            self._cells[i][j].draw_move(self._cells[i-1][j], True)  # undo
-            
-        # Right
-        if (j < self._num_cols - 1 and 
-            not self._cells[i][j].has_right_wall and 
-            not self._cells[i][j+1].visited):
-            self._cells[i][j].draw_move(self._cells[i][j+1])
-            if self._solve_r(i, j+1):
-                return True
-            self._cells[i][j].draw_move(self._cells[i][j+1], True)  # undo
-            
-        # Down
-        if (i < self._num_rows - 1 and 
-            not self._cells[i][j].has_bottom_wall and 
-            not self._cells[i+1][j].visited):
-            self._cells[i][j].draw_move(self._cells[i+1][j])
-            if self._solve_r(i+1, j):
-                return True
-            self._cells[i][j].draw_move(self._cells[i+1][j], True)  # undo
-            
-        # Left
-        if (j > 0 and 
-            not self._cells[i][j].has_left_wall and 
-            not self._cells[i][j-1].visited):
-            self._cells[i][j].draw_move(self._cells[i][j-1])
-            if self._solve_r(i, j-1):
-                return True
-            self._cells[i][j].draw_move(self._cells[i][j-1], True)  # undo
-        
-        return False
-
-    def _break_entrance_and_exit(self):
-        # For a 1x1 maze, remove both top and bottom walls.
-        if self._num_rows == 1 and self._num_cols == 1:
-            cell = self._cells[0][0]
-            cell.has_top_wall = False
-            cell.has_bottom_wall = False
-            self._draw_cell(0, 0)
-        else:
-            # For entrance cell (top-left): only remove the top wall.
-            self._cells[0][0].has_top_wall = False
-            self._draw_cell(0, 0)
-            
-            # For exit cell (bottom-right): only remove the bottom wall.
-            self._cells[self._num_rows-1][self._num_cols-1].has_bottom_wall = False
-            self._draw_cell(self._num_rows-1, self._num_cols-1)
+        # One bitmap pixel per screen pixel, at exactly the view's scale
+        image = PhotoImage(data=lod_image(self.__view_walls, view), format="PPM")
+        self.__view_image = image  # Tk drops images nothing references
+        self.__canvas.create_image(x0, y0, image=image, anchor="nw")
+        if self.stats is not None:
+            self.stats.draw_calls += 1
+
+
+class Viewport:
+    """
+    Zoom and pan state for showing a maze on a canvas: cell (i, j) covers
+    scale pixels square starting at (offset_x + j * scale, offset_y + i * scale).
+    """
+
+    MAX_SCALE = 64
+
+    def __init__(self, width, height, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.width = width
+        self.height = height
+        self.fit()
+
+    def fit(self):
+        # Whole maze visible and centered
+        self.scale = min(self.width / self.num_cols, self.height / self.num_rows)
+        self.offset_x = (self.width - self.num_cols * self.scale) / 2
+        self.offset_y = (self.height - self.num_rows * self.scale) / 2
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def zoom(self, factor, x, y):
+        # Scale about the screen point (x, y), which keeps showing the same spot
+        min_scale = min(self.width / self.num_cols, self.height / self.num_rows) / 2
+        scale = min(max(self.scale * factor, min_scale), self.MAX_SCALE)
+        ratio = scale / self.scale
+        self.offset_x = x - (x - self.offset_x) * ratio
+        self.offset_y = y - (y - self.offset_y) * ratio
+        self.scale = scale
+
+    def pan(self, dx, dy):
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def cell_origin(self, i, j):
+        return self.offset_x + j * self.scale, self.offset_y + i * self.scale
+
+    def visible_cells(self):
+        # (r0, r1, c0, c1): half-open row and column ranges of cells on screen
+        r0 = max(0, math.floor(-self.offset_y / self.scale))
+        r1 = min(self.num_rows, math.ceil((self.height - self.offset_y) / self.scale))
+        c0 = max(0, math.floor(-self.offset_x / self.scale))
+        c1 = min(self.num_cols, math.ceil((self.width - self.offset_x) / self.scale))
+        return r0, r1, c0, c1
+
+
+def view_segments(walls, view):
+    # Merged wall lines for the cells a Viewport can see, in screen coordinates
+    r0, r1, c0, c1 = view.visible_cells()
+    if r0 >= r1 or c0 >= c1:
+        return []
+    num_cols = view.num_cols
+    block = bytearray()
+    for i in range(r0, r1):
+        k = i * num_cols
+        block += walls[k + c0:k + c1]
+    x0, y0 = view.cell_origin(r0, c0)
+    return wall_segments(block, r1 - r0, c1 - c0, x0, y0, view.scale, view.scale)
+
+
+def lod_image(walls, view):
+    # Binary greyscale PGM (P5) of the cells a Viewport can see, drawn at its
+    # scale: pixel (x, y) shows cell (r0 + y // scale, c0 + x // scale)
+    r0, r1, c0, c1 = view.visible_cells()
+    scale = view.scale
+    width = max(1, round((c1 - c0) * scale))
+    height = max(1, round((r1 - r0) * scale))
+    columns = [min(int(x / scale), c1 - c0 - 1) for x in range(width)]
+    num_cols = view.num_cols
+    rows = []
+    source = None
+    for y in range(height):
+        i = r0 + min(int(y / scale), r1 - r0 - 1)
+        if i != source:
+            # Zoomed in, consecutive pixel rows repeat the same cell row
+            k = i * num_cols
+            cells = bytes(walls[k + c0:k + c1]).translate(_LOD_SHADES)
+            row = bytes(map(cells.__getitem__, columns))
+            source = i
+        rows.append(row)
+    header = f"P5 {width} {height} 255\n".encode("ascii")
+    return header + b"".join(rows)
+
 
 def main():
     # Calculate window size based on maze dimensions
@@ -294,5 +290,13 @@ def main():
     
     win.wait_for_close()
 
+def explore(num_rows=2000, num_cols=2000, seed=None, algorithm="dfs"):
+    # Build a large maze headlessly, then browse it with zoom and pan
+    maze = Maze(0, 0, num_rows, num_cols, 1, 1, seed=seed, compact=True,
+                algorithm=algorithm)
+    win = Window(800, 800)
+    maze.show(win)
+    win.wait_for_close()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file